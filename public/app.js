@@ -2,7 +2,15 @@
 let currentUid = '';
 let isReading = false;
 let isReadingLite = false;
-let apduLogEntries = [];
+let commLogGroups = [];
+let historyEntries = [];
+let historyCursor = 0;
+let historyEpoch = null;  // server instance the cursor belongs to
+let historyView = null;
+let selectedReader = localStorage.getItem('selectedReader') || '';  // "host:reader", '' = server default
+
+const COMM_LOG_MAX_GROUPS = 200;
+const HISTORY_ROW_HEIGHT = 66;
 
 // DOM Elements
 const statusIndicator = document.getElementById('statusIndicator');
@@ -22,10 +30,68 @@ const apduLogList = document.getElementById('apduLogList');
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
+    historyView = new VirtualList(historyList, HISTORY_ROW_HEIGHT, renderHistoryRow,
+        '<div class="history-empty">No records yet</div>');
     refreshReaders();
     loadHistory();
 });
 
+// Virtual list: only rows inside the scroll viewport (plus overscan) are in the DOM
+class VirtualList {
+    constructor(container, rowHeight, renderRow, emptyHtml) {
+        this.container = container;
+        this.rowHeight = rowHeight;
+        this.renderRow = renderRow;
+        this.emptyHtml = emptyHtml;
+        this.items = [];
+        this.overscan = 6;
+        this.range = null;
+        this.frame = null;
+
+        this.spacer = document.createElement('div');
+        this.spacer.className = 'virtual-spacer';
+        container.innerHTML = '';
+        container.appendChild(this.spacer);
+        container.addEventListener('scroll', () => this.scheduleRender());
+    }
+
+    setItems(items) {
+        this.items = items;
+        this.range = null;
+        this.render();
+    }
+
+    scheduleRender() {
+        if (this.frame) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render();
+        });
+    }
+
+    render() {
+        if (this.items.length === 0) {
+            this.spacer.style.height = '';
+            this.spacer.innerHTML = this.emptyHtml;
+            return;
+        }
+
+        const { scrollTop, clientHeight } = this.container;
+        const start = Math.max(0, Math.floor(scrollTop / this.rowHeight) - this.overscan);
+        const end = Math.min(this.items.length,
+            Math.ceil((scrollTop + clientHeight) / this.rowHeight) + this.overscan);
+        if (this.range && this.range[0] === start && this.range[1] === end) return;
+        this.range = [start, end];
+
+        this.spacer.style.height = `${this.items.length * this.rowHeight}px`;
+        this.spacer.innerHTML = this.items.slice(start, end).map((item, i) => `
+            <div class="virtual-row" style="top: ${(start + i) * this.rowHeight}px; height: ${this.rowHeight}px;">
+                ${this.renderRow(item)}
+            </div>
+        `).join('');
+    }
+}
+
 // Set status
 function setStatus(status, message) {
     statusIndicator.className = 'status-indicator ' + status;
@@ -41,53 +107,135 @@ function showToast(message, type = 'success') {
     }, 3000);
 }
 
+// Fetch a long-running operation as an NDJSON stream. Events are passed to
+// onEvent as they arrive; resolves with the final result, with the streamed
+// log entries attached as comm_log so callers treat it like a JSON response.
+async function fetchStream(url, options = {}, onEvent) {
+    const response = await fetch(url, {
+        ...options,
+        headers: { ...(options.headers || {}), Accept: 'application/x-ndjson' }
+    });
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const logs = [];
+    let buffer = '';
+    let result = null;
+
+    const handleLine = (line) => {
+        if (!line.trim()) return;
+        const event = JSON.parse(line);
+        if (event.event === 'log') {
+            logs.push({ type: event.type, data: event.data, desc: event.desc });
+        } else if (event.event === 'result') {
+            result = event.result;
+        } else if (event.event === undefined) {
+            result = event;  // plain JSON reply, e.g. request validation error
+        }
+        if (onEvent) onEvent(event);
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(handleLine);
+    }
+    handleLine(buffer + decoder.decode());
+
+    if (!result) {
+        throw new Error('Stream ended without result');
+    }
+    result.comm_log = logs;
+    return result;
+}
+
+// Stream event handler that keeps the status indicator showing live progress
+function streamProgress(label) {
+    let apdus = 0;
+    return (event) => {
+        if (event.event !== 'log') return;
+        if (event.type === 'TX') {
+            apdus += 1;
+            setStatus('reading', `${label} (${apdus} APDUs)`);
+        } else if (event.type === 'RECOVER') {
+            setStatus('reading', `${label} (recovering...)`);
+        }
+    };
+}
+
 // Communication Log functions
+// Each operation is one collapsed group; its rows are rendered on first expand.
 function addCommLogEntries(logs, operation) {
     if (!logs || logs.length === 0) return;
 
-    const timestamp = new Date().toLocaleTimeString();
-    logs.forEach((log, index) => {
-        apduLogEntries.unshift({
-            timestamp,
-            operation,
-            index: index + 1,
-            total: logs.length,
-            type: log.type,
-            data: log.data,
-            desc: log.desc
-        });
-    });
+    const group = {
+        timestamp: new Date().toLocaleTimeString(),
+        operation,
+        logs
+    };
+    commLogGroups.unshift(group);
 
-    // Keep only last 200 entries
-    if (apduLogEntries.length > 200) {
-        apduLogEntries = apduLogEntries.slice(0, 200);
+    if (commLogGroups.length === 1) {
+        apduLogList.innerHTML = '';
     }
+    apduLogList.prepend(createCommLogGroupElement(group));
 
-    renderCommLog();
+    // Keep only last COMM_LOG_MAX_GROUPS operations
+    while (commLogGroups.length > COMM_LOG_MAX_GROUPS) {
+        commLogGroups.pop();
+        apduLogList.lastElementChild.remove();
+    }
 }
 
-function renderCommLog() {
-    if (apduLogEntries.length === 0) {
-        apduLogList.innerHTML = '<div class="log-empty">No communication data yet</div>';
-        return;
-    }
+function createCommLogGroupElement(group) {
+    const lastRx = group.logs.filter(log => log.type === 'RX').pop();
+    const itemClass = lastRx ? getItemClass('RX', lastRx.data) : '';
+    const apduCount = group.logs.filter(log => log.type === 'TX').length;
+
+    const element = document.createElement('details');
+    element.className = `log-item log-group ${itemClass}`;
+    element.innerHTML = `
+        <summary class="log-timestamp">
+            ${group.timestamp} - ${group.operation} (${group.logs.length} entries, ${apduCount} APDUs${lastRx ? `, SW ${lastRx.data.slice(-4)}` : ''})
+        </summary>
+    `;
+    element.addEventListener('toggle', () => {
+        if (element.open && !group.rendered) {
+            group.rendered = true;
+            element.insertAdjacentHTML('beforeend', renderCommLogRows(group.logs));
+        }
+    });
+    return element;
+}
 
-    apduLogList.innerHTML = apduLogEntries.map(entry => {
-        const typeClass = getTypeClass(entry.type);
-        const itemClass = getItemClass(entry.type, entry.data);
+function renderCommLogRows(logs) {
+    return logs.map((log, index) => {
+        const typeClass = getTypeClass(log.type);
         return `
-            <div class="log-item ${itemClass}">
-                <div class="log-timestamp">${entry.timestamp} - ${entry.operation} (${entry.index}/${entry.total})</div>
-                <div class="log-row ${typeClass}">
-                    <span class="log-type">${entry.type}</span>
-                    <span class="log-data">${entry.data || '(none)'}</span>
-                </div>
-                ${entry.desc ? `<div class="log-desc">${entry.desc}</div>` : ''}
+            <div class="log-row ${typeClass}">
+                <span class="log-type">${index + 1}. ${log.type}</span>
+                <span class="log-data">${log.data || '(none)'}</span>
             </div>
+            ${log.desc ? `<div class="log-desc">${log.desc}</div>` : ''}
         `;
     }).join('');
 }
 
+function renderCommLog() {
+    if (commLogGroups.length === 0) {
+        apduLogList.innerHTML = '<div class="log-empty">No communication data yet</div>';
+        return;
+    }
+
+    apduLogList.innerHTML = '';
+    commLogGroups.forEach(group => {
+        group.rendered = false;
+        apduLogList.appendChild(createCommLogGroupElement(group));
+    });
+}
+
 function getTypeClass(type) {
     switch (type) {
         case 'TX': return 'log-tx';
@@ -95,6 +243,9 @@ function getTypeClass(type) {
         case 'ATR': return 'log-atr';
         case 'CONNECT': return 'log-connect';
         case 'CONNECTED': return 'log-connected';
+        case 'RECOVER':
+        case 'RESELECT':
+        case 'REVERIFY': return 'log-recover';
         default: return '';
     }
 }
@@ -109,7 +260,7 @@ function getItemClass(type, data) {
 }
 
 function clearApduLog() {
-    apduLogEntries = [];
+    commLogGroups = [];
     renderCommLog();
     showToast('Log cleared', 'success');
 }
@@ -122,33 +273,59 @@ function disableControls() {
     });
 }
 
-// Refresh readers
+// Append the selected reader ("host:reader") to a card API URL
+function readerUrl(url) {
+    if (!selectedReader) {
+        return url;
+    }
+    return `${url}${url.includes('?') ? '&' : '?'}reader=${encodeURIComponent(selectedReader)}`;
+}
+
+// Select which reader (local or on an agent) card operations go to
+function selectReader(id) {
+    selectedReader = id;
+    localStorage.setItem('selectedReader', id);
+    refreshReaders();
+}
+
+// Refresh readers (merged across local readers and remote agents)
 async function refreshReaders() {
     nfcList.innerHTML = '<div class="nfc-list-loading">Scanning...</div>';
     try {
         const response = await fetch('/api/readers');
         const data = await response.json();
-
-        if (data.success && data.readers.length > 0) {
-            const targetIndex = data.readers.length > 1 ? 1 : 0;
-            nfcList.innerHTML = data.readers.map((reader, index) => {
-                const isActive = index === targetIndex;
+        const targets = data.targets || (data.readers || []).map((name, index) =>
+            ({ id: `local:${index}`, host: 'local', index, name }));
+        const hostErrors = (data.hosts || []).filter(host => host.error).map(host =>
+            `<div class="nfc-list-error">${host.host}: ${host.stale ? 'unreachable, showing cached list' : host.error}</div>`
+        ).join('');
+
+        if (data.success && targets.length > 0) {
+            // Without a selection the script default applies: local index 1 if present, else 0
+            const local = targets.filter(target => target.host === 'local');
+            if (!selectedReader && local.length === 0) {
+                selectedReader = targets[0].id;
+            }
+            const activeId = selectedReader || (local.length > 1 ? local[1].id : local[0].id);
+            nfcList.innerHTML = targets.map((target) => {
+                const isActive = target.id === activeId;
+                const where = target.host === 'local' ? `Index ${target.index}` : `${target.host} · Index ${target.index}`;
                 return `
-                    <div class="nfc-reader-item ${isActive ? 'active' : ''}">
+                    <div class="nfc-reader-item ${isActive ? 'active' : ''}" onclick="selectReader('${target.id}')" title="Use this reader">
                         <div class="reader-status-dot ${isActive ? 'active' : ''}"></div>
                         <div class="reader-details">
-                            <div class="reader-name">${reader}</div>
-                            <div class="reader-index">${isActive ? 'Active' : `Index ${index}`}</div>
+                            <div class="reader-name">${target.name}</div>
+                            <div class="reader-index">${isActive ? `Active · ${where}` : where}</div>
                         </div>
                     </div>
                 `;
-            }).join('');
+            }).join('') + hostErrors;
             setStatus('', 'Ready');
-        } else if (data.readers && data.readers.length === 0) {
-            nfcList.innerHTML = '<div class="nfc-list-empty">No readers found</div>';
+        } else if (data.readers && data.readers.length === 0 && !data.error) {
+            nfcList.innerHTML = '<div class="nfc-list-empty">No readers found</div>' + hostErrors;
             setStatus('error', 'No Reader');
         } else {
-            nfcList.innerHTML = `<div class="nfc-list-error">${data.error || 'Error'}</div>`;
+            nfcList.innerHTML = hostErrors || `<div class="nfc-list-error">${data.error || 'Error'}</div>`;
             setStatus('error', 'Error');
         }
     } catch (error) {
@@ -170,7 +347,7 @@ async function readUid() {
     uidActions.style.display = 'none';
 
     try {
-        const response = await fetch('/api/uid');
+        const response = await fetch(readerUrl('/api/uid'));
         const data = await response.json();
 
         // Log APDU transactions
@@ -203,6 +380,54 @@ async function readUid() {
     }
 }
 
+// Identify card type from ATR and show its info
+async function identifyCard() {
+    if (isReading) return;
+
+    const btn = document.getElementById('identifyBtn');
+    isReading = true;
+    btn.disabled = true;
+    btn.classList.add('loading');
+    setStatus('reading', 'Identifying...');
+
+    uidDisplay.innerHTML = '<div class="uid-placeholder">Identifying card...</div>';
+    uidActions.style.display = 'none';
+
+    try {
+        const data = await fetchStream(readerUrl('/api/card'), {}, streamProgress('Identifying...'));
+
+        // Log APDU transactions
+        if (data.comm_log) {
+            addCommLogEntries(data.comm_log, 'Identify');
+        }
+
+        if (data.family) {
+            const info = data.info || {};
+            const version = data.version ? ` ${data.version.toUpperCase()}` : '';
+            currentUid = info.uid || '';
+            uidDisplay.innerHTML = `
+                <div class="uid-value">${data.name}${version}</div>
+                <div class="uid-placeholder">${info.uid || info.serial_number || data.atr} · ${data.source}${data.learned ? ' (learned)' : ''}</div>
+            `;
+            uidActions.style.display = currentUid ? 'block' : 'none';
+            setStatus(data.success ? '' : 'error', data.success ? 'Success' : 'Failed');
+            showToast(data.success ? `Identified: ${data.name}` : data.error, data.success ? 'success' : 'error');
+        } else {
+            uidDisplay.innerHTML = `<div class="uid-error">❌ ${data.error}</div>`;
+            setStatus('error', 'Failed');
+            showToast(data.error, 'error');
+        }
+    } catch (error) {
+        uidDisplay.innerHTML = '<div class="uid-error">❌ Connection error</div>';
+        setStatus('error', 'Error');
+        showToast('Failed to connect to server', 'error');
+    } finally {
+        isReading = false;
+        btn.disabled = false;
+        btn.classList.remove('loading');
+    }
+}
+
 // Copy UID to clipboard
 async function copyUid() {
     if (!currentUid) return;
@@ -235,43 +460,60 @@ async function copyHistoryUid(uid) {
     }
 }
 
-// Load history
+// Load history (only records newer than historyCursor are downloaded)
 async function loadHistory() {
     try {
-        const response = await fetch('/api/history');
-        const history = await response.json();
+        const response = await fetch(`/api/history?since=${historyCursor}`);
+        const data = await response.json();
 
-        if (history.length === 0) {
-            historyList.innerHTML = '<div class="history-empty">No records yet</div>';
-            return;
+        if ((historyEpoch !== null && data.epoch !== historyEpoch) || data.cursor < historyCursor) {
+            // Server restarted: ids start over and the cursor means nothing, reload everything
+            historyCursor = 0;
+            historyEpoch = null;
+            historyEntries = [];
+            return loadHistory();
         }
+        historyEpoch = data.epoch;
 
-        historyList.innerHTML = history.map(item => {
-            const time = new Date(item.timestamp);
-            const timeStr = time.toLocaleTimeString();
-            const dateStr = time.toLocaleDateString();
-            return `
-                <div class="history-item">
-                    <div>
-                        <div class="history-uid" onclick="copyHistoryUid('${item.uid}')" title="Click to copy">
-                            ${item.uid}
-                        </div>
-                        <div class="history-time">${dateStr} ${timeStr}</div>
-                    </div>
-                </div>
-            `;
-        }).join('');
+        // Drop records trimmed or cleared on the server
+        if (data.oldest === null) {
+            historyEntries = [];
+        } else if (historyEntries.length > 0 && historyEntries[historyEntries.length - 1].id < data.oldest) {
+            historyEntries = historyEntries.filter(item => item.id >= data.oldest);
+        }
+
+        historyEntries = data.entries.concat(historyEntries);
+        historyCursor = data.cursor;
+        historyView.setItems(historyEntries);
     } catch (error) {
-        historyList.innerHTML = '<div class="history-empty">Failed to load history</div>';
+        historyView.spacer.innerHTML = '<div class="history-empty">Failed to load history</div>';
     }
 }
 
+function renderHistoryRow(item) {
+    const time = new Date(item.timestamp);
+    const timeStr = time.toLocaleTimeString();
+    const dateStr = time.toLocaleDateString();
+    return `
+        <div class="history-item">
+            <div>
+                <div class="history-uid" onclick="copyHistoryUid('${item.uid}')" title="Click to copy">
+                    ${item.uid}
+                </div>
+                <div class="history-time">${dateStr} ${timeStr}${item.host && item.host !== 'local' ? ` · ${item.host}` : ''}</div>
+            </div>
+        </div>
+    `;
+}
+
 // Clear history
 async function clearHistory() {
     if (!confirm('Clear all history?')) return;
 
     try {
         await fetch('/api/history', { method: 'DELETE' });
+        historyEntries = [];
+        historyView.setItems(historyEntries);
         loadHistory();
         showToast('History cleared', 'success');
     } catch (error) {
@@ -311,8 +553,7 @@ async function readLiteInfo() {
 
     try {
         const version = liteVersion.value;
-        const response = await fetch(`/api/lite/info?version=${version}`);
-        const data = await response.json();
+        const data = await fetchStream(readerUrl(`/api/lite/info?version=${version}`), {}, streamProgress('Reading Lite...'));
 
         // Log APDU transactions
         if (data.comm_log) {
@@ -362,6 +603,64 @@ async function readLiteInfo() {
     }
 }
 
+// Run OneKey Lite flow (verify / backup / restore) in one card session
+async function runLiteFlow(action) {
+    if (isReadingLite) return;
+
+    const pin = document.getElementById('litePin').value.trim();
+    const data = document.getElementById('liteData').value.replace(/\s/g, '');
+    const overwrite = document.getElementById('liteOverwrite').checked;
+    const resultDiv = document.getElementById('liteFlowResult');
+
+    if (!/^\d{6}$/.test(pin)) {
+        showToast('PIN must be 6 digits', 'error');
+        return;
+    }
+    if (action === 'backup' && !data) {
+        showToast('Please enter data to back up', 'error');
+        return;
+    }
+    if (action === 'backup' && overwrite && !confirm('Overwrite the existing backup on this card?')) return;
+
+    isReadingLite = true;
+    setStatus('reading', `Lite ${action}...`);
+    resultDiv.innerHTML = '<div class="result-placeholder">Working...</div>';
+
+    try {
+        const result = await fetchStream(readerUrl(`/api/lite/${action}`), {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ version: liteVersion.value, pin, data, overwrite })
+        }, streamProgress(`Lite ${action}...`));
+
+        // Log APDU transactions
+        if (result.comm_log) {
+            addCommLogEntries(result.comm_log, `Lite ${action}`);
+        }
+
+        if (result.success) {
+            resultDiv.innerHTML = `
+                <div class="result-success">
+                    <div class="result-row">${action.charAt(0).toUpperCase() + action.slice(1)} successful${result.bytes !== undefined ? ` (${result.bytes} bytes)` : ''}</div>
+                    ${result.data ? `<div class="result-data">${result.data}</div>` : ''}
+                </div>
+            `;
+            setStatus('', 'Success');
+            showToast(`Lite ${action} successful!`, 'success');
+        } else {
+            resultDiv.innerHTML = `<div class="result-error">${result.error}</div>`;
+            setStatus('error', 'Failed');
+            showToast(result.error, 'error');
+        }
+    } catch (error) {
+        resultDiv.innerHTML = '<div class="result-error">Connection error</div>';
+        setStatus('error', 'Error');
+        showToast('Failed to connect to server', 'error');
+    } finally {
+        isReadingLite = false;
+    }
+}
+
 // Format status for display
 function formatStatus(status) {
     const statusMap = {
@@ -385,7 +684,7 @@ async function sendApdu() {
     apduOutput.innerHTML = '<div class="debug-placeholder">Sending...</div>';
 
     try {
-        const response = await fetch('/api/lite/apdu', {
+        const response = await fetch(readerUrl('/api/lite/apdu'), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ apdu })
@@ -433,8 +732,7 @@ async function readType4Info() {
 
     try {
         const aid = type4Aid.value.replace(/\s/g, '');
-        const response = await fetch(`/api/type4/info?aid=${aid}`);
-        const data = await response.json();
+        const data = await fetchStream(readerUrl(`/api/type4/info?aid=${aid}`), {}, streamProgress('Connecting...'));
 
         // Log APDU transactions
         if (data.comm_log) {
@@ -505,6 +803,78 @@ async function readType4Info() {
     }
 }
 
+async function scanAids() {
+    if (isReadingType4) return;
+
+    isReadingType4 = true;
+    const btn = document.getElementById('scanAidsBtn');
+    btn.disabled = true;
+    btn.classList.add('loading');
+    setStatus('reading', 'Scanning AIDs...');
+
+    type4Info.innerHTML = '<div class="type4-placeholder">Scanning AIDs...</div>';
+    type4Operations.style.display = 'none';
+
+    try {
+        const aid = type4Aid.value.replace(/\s/g, '');
+        const data = await fetchStream(readerUrl(`/api/type4/scan?aids=${aid}`), {}, streamProgress('Scanning AIDs...'));
+
+        // Log APDU transactions
+        if (data.comm_log) {
+            addCommLogEntries(data.comm_log, 'AID Scan');
+        }
+
+        if (data.success) {
+            const found = data.present.length > 0
+                ? data.present.map(item => `
+                    <div class="info-item aid-scan-item" onclick="useScannedAid('${item.aid}')" title="Click to use this AID">
+                        <span class="info-label">${item.name}</span>
+                        <span class="info-value status-set">${item.aid}</span>
+                    </div>
+                `).join('')
+                : `
+                    <div class="info-item">
+                        <span class="info-label">AIDs</span>
+                        <span class="info-value status-not-set">None found</span>
+                    </div>
+                `;
+            type4Info.innerHTML = `
+                <div class="type4-info-grid">
+                    <div class="info-item">
+                        <span class="info-label">ATR</span>
+                        <span class="info-value atr-value">${data.atr || 'N/A'}</span>
+                    </div>
+                    <div class="info-item">
+                        <span class="info-label">APDUs (Cache)</span>
+                        <span class="info-value">${data.apdu_count} (${data.cache_hit ? 'hit' : 'miss'})</span>
+                    </div>
+                    ${found}
+                </div>
+                ${data.pruned && data.pruned.length > 0 ? `<div class="lite-errors">${data.pruned.join(', ')}</div>` : ''}
+            `;
+            setStatus('', 'Success');
+            showToast(`Found ${data.present.length} AID(s)`, 'success');
+        } else {
+            type4Info.innerHTML = `<div class="type4-error">${data.error}</div>`;
+            setStatus('error', 'Failed');
+            showToast(data.error, 'error');
+        }
+    } catch (error) {
+        type4Info.innerHTML = '<div class="type4-error">Connection error</div>';
+        setStatus('error', 'Error');
+        showToast('Failed to connect to server', 'error');
+    } finally {
+        isReadingType4 = false;
+        btn.disabled = false;
+        btn.classList.remove('loading');
+    }
+}
+
+function useScannedAid(aid) {
+    type4Aid.value = aid;
+    readType4Info();
+}
+
 function switchTab(tab) {
     document.querySelectorAll('.tab-btn').forEach(btn => btn.classList.remove('active'));
     document.querySelectorAll('.tab-content').forEach(content => content.style.display = 'none');
@@ -527,12 +897,25 @@ async function type4Read() {
     resultDiv.innerHTML = '<div class="result-placeholder">Reading...</div>';
 
     try {
-        const response = await fetch('/api/type4/read', {
+        // Show chunks as they are read
+        const progress = streamProgress('Reading...');
+        const chunks = [];
+        let received = 0;
+        const data = await fetchStream(readerUrl('/api/type4/read'), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ aid, offset, length })
+        }, (event) => {
+            progress(event);
+            if (event.event === 'data') {
+                chunks.push(event.data);
+                received += event.data.split(' ').length;
+                resultDiv.innerHTML = `
+                    <div class="result-placeholder">Reading... ${received}/${length} bytes</div>
+                    <div class="result-data">${chunks.join(' ')}</div>
+                `;
+            }
         });
-        const data = await response.json();
 
         // Log APDU transactions
         if (data.comm_log) {
@@ -569,7 +952,7 @@ async function type4Write() {
     resultDiv.innerHTML = '<div class="result-placeholder">Writing...</div>';
 
     try {
-        const response = await fetch('/api/type4/write', {
+        const response = await fetch(readerUrl('/api/type4/write'), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ aid, offset, data: dataHex })
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+APDU Core
+Immutable bytes-backed command/response types for ISO 7816-4 APDUs
+and precompiled constant commands used by read_uid.py
+"""
+
+
+def parse_hex(hex_str):
+    """Parse hex string (spaces and optional 0x allowed) into bytes"""
+    hex_str = "".join(hex_str.split())
+    if hex_str[:2] in ("0x", "0X"):
+        hex_str = hex_str[2:]
+    return bytes.fromhex(hex_str)
+
+
+def hex_upper(data, sep=""):
+    """Format bytes as upper-case hex, optionally separated ('01 02 03')"""
+    return (data.hex(sep) if sep else data.hex()).upper()
+
+
+class Command:
+    """Command APDU backed by immutable bytes
+
+    The hex form is computed once and cached, so logging the same
+    precompiled command repeatedly costs nothing.
+    """
+
+    __slots__ = ("_raw", "_hex")
+
+    def __init__(self, raw):
+        raw = bytes(raw)
+        if len(raw) < 4:
+            raise ValueError("APDU must have at least 4 header bytes")
+        self._raw = raw
+        self._hex = None
+
+    @classmethod
+    def build(cls, cla, ins, p1, p2, data=b"", le=None):
+        """Build a command, using extended length only when needed"""
+        n = len(data)
+        extended = n > 0xFF or (le is not None and le > 0x100)
+        body = b""
+        if n:
+            body = (b"\x00" + n.to_bytes(2, "big") if extended else bytes((n,))) + bytes(data)
+        if le is not None:
+            if extended:
+                body += (b"" if n else b"\x00") + (le & 0xFFFF).to_bytes(2, "big")
+            else:
+                body += bytes((le & 0xFF,))
+        return cls(bytes((cla, ins, p1, p2)) + body)
+
+    @classmethod
+    def from_hex(cls, hex_str):
+        """Parse a command from its hex form"""
+        return cls(parse_hex(hex_str))
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def hex(self):
+        if self._hex is None:
+            self._hex = hex_upper(self._raw)
+        return self._hex
+
+    def __bytes__(self):
+        return self._raw
+
+    def __len__(self):
+        return len(self._raw)
+
+    def __getitem__(self, index):
+        return self._raw[index]
+
+    def __eq__(self, other):
+        return isinstance(other, Command) and self._raw == other._raw
+
+    def __hash__(self):
+        return hash(self._raw)
+
+    def __repr__(self):
+        return f"Command({self.hex()})"
+
+
+class Response:
+    """Response APDU: data bytes plus status word"""
+
+    __slots__ = ("data", "sw1", "sw2")
+
+    def __init__(self, data, sw1, sw2):
+        self.data = data if isinstance(data, bytes) else bytes(data)
+        self.sw1 = sw1
+        self.sw2 = sw2
+
+    @property
+    def ok(self):
+        return self.sw1 == 0x90
+
+    @property
+    def sw(self):
+        return (self.sw1 << 8) | self.sw2
+
+    @property
+    def sw_hex(self):
+        return f"{self.sw1:02X}{self.sw2:02X}"
+
+    def hex(self, sep=""):
+        return hex_upper(self.data, sep)
+
+    def __repr__(self):
+        return f"Response({self.hex()}, {self.sw_hex})"
+
+
+# Precompiled constant commands
+GET_UID = Command.build(0xFF, 0xCA, 0x00, 0x00, le=0)
+
+# OneKey Lite
+AID_BACKUP_V1 = bytes.fromhex("D156000132834001")
+AID_BACKUP_V2 = b"onekey.backup\x01"
+SELECT_PRIMARY_SAFETY = Command.build(0x00, 0xA4, 0x04, 0x00, le=0)  # Select with no data
+SELECT_BACKUP_V1 = Command.build(0x00, 0xA4, 0x04, 0x00, AID_BACKUP_V1)
+SELECT_BACKUP_V2 = Command.build(0x00, 0xA4, 0x04, 0x00, AID_BACKUP_V2)
+GET_DEVICE_CERTIFICATE = Command.build(0x80, 0xCA, 0xBF, 0x21, bytes.fromhex("A60483021518"), le=0)
+GET_BACKUP_STATUS = Command.build(0x80, 0x6A, 0x00, 0x00, le=0)
+GET_PIN_STATUS = Command.build(0x80, 0xCB, 0x80, 0x00, bytes.fromhex("DFFF028105"), le=0)
+GET_SERIAL_NUMBER = Command.build(0x80, 0xCB, 0x80, 0x00, bytes.fromhex("DFFF028101"), le=0)
+GET_PIN_RETRY_COUNT = Command.build(0x80, 0xCB, 0x80, 0x00, bytes.fromhex("DFFF028102"), le=0)
+RESET_CARD = Command.build(0x80, 0xCB, 0x80, 0x00, bytes.fromhex("DFFE028205"))
+EXPORT_DATA = Command.build(0x80, 0x4B, 0x00, 0x00, le=0)
+
+# NFC Forum Type 4
+NDEF_APP_AID = bytes.fromhex("D2760000850101")
+SELECT_NDEF_APP = Command.build(0x00, 0xA4, 0x04, 0x00, NDEF_APP_AID, le=0)
+NDEF_CC_FILE_ID = 0xE103
+
+
+def select_aid_command(aid, le=0):
+    """SELECT by DF name"""
+    return Command.build(0x00, 0xA4, 0x04, 0x00, aid, le=le)
+
+
+def select_file_command(file_id):
+    """SELECT by file ID, no FCI returned"""
+    return Command.build(0x00, 0xA4, 0x00, 0x0C, (file_id & 0xFFFF).to_bytes(2, "big"))
+
+
+def read_binary_command(offset, length):
+    """READ BINARY"""
+    return Command.build(0x00, 0xB0, (offset >> 8) & 0xFF, offset & 0xFF, le=length)
+
+
+def write_binary_command(offset, data):
+    """WRITE BINARY"""
+    return Command.build(0x00, 0xD0, (offset >> 8) & 0xFF, offset & 0xFF, data)
+
+
+def update_binary_command(offset, data):
+    """UPDATE BINARY"""
+    return Command.build(0x00, 0xD6, (offset >> 8) & 0xFF, offset & 0xFF, data)
+
+
+def get_response_command(length):
+    """GET RESPONSE for 61xx"""
+    return Command.build(0x00, 0xC0, 0x00, 0x00, le=length)
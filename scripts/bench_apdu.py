@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+APDU Microbenchmark
+Measures per-APDU CPU for the host-side work around one card exchange
+(build command, log TX/RX hex, format response) with the old list-of-int
+code path versus the bytes-backed Command/Response types in apdu.py.
+No reader is needed: the card is replaced by a canned response.
+"""
+
+import sys
+import json
+import timeit
+import argparse
+
+import apdu
+from apdu import Response
+
+READ_LENGTH = 0xFF
+CANNED_DATA = list(range(READ_LENGTH))
+
+
+def legacy_exchange(build, response_data):
+    """List-of-int path: build list, f-string hex for TX/RX, toHexString-style output"""
+    cmd = build()
+    tx_hex = ''.join(f'{b:02X}' for b in cmd)
+    data, sw1, sw2 = list(response_data), 0x90, 0x00
+    rx_hex = ''.join(f'{b:02X}' for b in data) + f'{sw1:02X}{sw2:02X}'
+    formatted = ' '.join(f'{b:02X}' for b in data)
+    return tx_hex, rx_hex, formatted
+
+
+def bytes_exchange(build, response_data):
+    """Bytes path: Command (cached hex), list() for pyscard, Response hex"""
+    command = build()
+    raw = list(command.raw)
+    tx_hex = command.hex()
+    response = Response(response_data, 0x90, 0x00)
+    rx_hex = response.hex() + response.sw_hex
+    formatted = response.hex(' ')
+    return raw, tx_hex, rx_hex, formatted
+
+
+CASES = [
+    # (name, legacy builder, bytes builder, response data)
+    ("constant (GET_PIN_STATUS)",
+     lambda: [0x80, 0xCB, 0x80, 0x00, 0x05, 0xDF, 0xFF, 0x02, 0x81, 0x05, 0x00],
+     lambda: apdu.GET_PIN_STATUS,
+     [0x02]),
+    ("built (SELECT AID)",
+     lambda: [0x00, 0xA4, 0x04, 0x00, 7] + [int("D2760000850101"[i:i + 2], 16) for i in range(0, 14, 2)] + [0x00],
+     lambda: apdu.select_aid_command(bytes.fromhex("D2760000850101")),
+     [0x6F, 0x00]),
+    ("READ BINARY (255 bytes)",
+     lambda: [0x00, 0xB0, 0x01, 0x00, READ_LENGTH],
+     lambda: apdu.read_binary_command(0x100, READ_LENGTH),
+     CANNED_DATA),
+]
+
+
+def run(number, repeat):
+    """Best-of-repeat microseconds per APDU for each case"""
+    rows = []
+    for name, legacy_build, bytes_build, data in CASES:
+        legacy = min(timeit.repeat(lambda: legacy_exchange(legacy_build, data), number=number, repeat=repeat))
+        native = min(timeit.repeat(lambda: bytes_exchange(bytes_build, data), number=number, repeat=repeat))
+        legacy_us = legacy / number * 1e6
+        native_us = native / number * 1e6
+        rows.append({
+            "case": name,
+            "legacy_us": round(legacy_us, 2),
+            "bytes_us": round(native_us, 2),
+            "saved_us": round(legacy_us - native_us, 2),
+            "speedup": round(legacy_us / native_us, 2) if native_us else None,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-APDU CPU: list-of-int vs bytes-backed APDU core")
+    parser.add_argument('-n', '--number', type=int, default=20000, help='Exchanges per timing run (default: 20000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs, best is kept (default: 5)')
+    parser.add_argument('--json', action='store_true', help='Output raw JSON')
+    args = parser.parse_args()
+
+    rows = run(args.number, args.repeat)
+    if args.json:
+        print(json.dumps(rows))
+        return
+
+    print(f"{'case':<28}{'legacy µs':>12}{'bytes µs':>12}{'saved µs':>12}{'speedup':>10}")
+    for row in rows:
+        print(f"{row['case']:<28}{row['legacy_us']:>12.2f}{row['bytes_us']:>12.2f}{row['saved_us']:>12.2f}{row['speedup']:>9.2f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Mock Readers
+In-memory stand-ins for pyscard readers, each holding a simulated
+NFC Forum Type 4 tag, so read_uid.py and its agent mode can run
+without hardware (--mock-readers N)
+"""
+
+import hashlib
+
+import apdu
+
+# PC/SC contactless ATR of an ISO 14443-4 Type A tag (NTAG 424 DNA family)
+MOCK_ATR = bytes.fromhex("3B8180018080")
+NDEF_FILE_ID = 0xE104
+NDEF_MAX_SIZE = 0x0400
+# CC file: version 2.0, MLe/MLc 255, NDEF file control TLV (E104, 1 KiB, open read/write)
+CC_FILE = bytes.fromhex("000F2000FF00FF0406E104040000") + b"\x00"
+
+SW_OK = (0x90, 0x00)
+SW_FILE_NOT_FOUND = (0x6A, 0x82)
+SW_WRONG_PARAMS = (0x6B, 0x00)
+SW_INS_NOT_SUPPORTED = (0x6D, 0x00)
+SW_CONDITIONS = (0x69, 0x85)
+
+
+def ndef_text_message(text):
+    """NLEN-prefixed NDEF message with one well-known Text record"""
+    payload = b"\x02en" + text.encode("utf-8")
+    record = bytes((0xD1, 0x01, len(payload))) + b"T" + payload
+    return len(record).to_bytes(2, "big") + record
+
+
+class MockCard:
+    """Type 4 tag memory: CC file plus one NDEF file"""
+
+    def __init__(self, uid, text):
+        self.uid = uid
+        ndef = ndef_text_message(text)
+        self.files = {
+            apdu.NDEF_CC_FILE_ID: bytearray(CC_FILE),
+            NDEF_FILE_ID: bytearray(ndef) + bytearray(NDEF_MAX_SIZE - len(ndef)),
+        }
+
+
+class MockConnection:
+    """pyscard-compatible connection to a MockCard"""
+
+    def __init__(self, card):
+        self.card = card
+        self.app_selected = False
+        self.file = None
+
+    def connect(self, *args, **kwargs):
+        self.app_selected = False
+        self.file = None
+
+    def reconnect(self, *args, **kwargs):
+        self.connect()
+
+    def disconnect(self):
+        pass
+
+    def getATR(self):
+        return list(MOCK_ATR)
+
+    def transmit(self, command):
+        data, (sw1, sw2) = self.handle(bytes(command))
+        return list(data), sw1, sw2
+
+    def handle(self, raw):
+        if len(raw) < 4:
+            return b"", SW_WRONG_PARAMS
+        cla, ins, p1, p2 = raw[:4]
+        body = raw[5:5 + raw[4]] if len(raw) > 5 else b""
+        if (cla, ins) == (0xFF, 0xCA):
+            return self.card.uid, SW_OK
+        if ins == 0xA4 and p1 == 0x04:
+            self.app_selected = body == apdu.NDEF_APP_AID
+            self.file = None
+            return b"", SW_OK if self.app_selected else SW_FILE_NOT_FOUND
+        if ins == 0xA4 and p1 == 0x00:
+            file_id = int.from_bytes(body, "big") if len(body) == 2 else None
+            if not self.app_selected or file_id not in self.card.files:
+                return b"", SW_FILE_NOT_FOUND
+            self.file = self.card.files[file_id]
+            return b"", SW_OK
+        if ins in (0xB0, 0xD0, 0xD6):
+            if self.file is None:
+                return b"", SW_CONDITIONS
+            offset = (p1 << 8) | p2
+            if ins == 0xB0:
+                length = raw[4] if len(raw) == 5 and raw[4] else 0x100
+                if offset >= len(self.file):
+                    return b"", SW_WRONG_PARAMS
+                return bytes(self.file[offset:offset + length]), SW_OK
+            if self.file is self.card.files[apdu.NDEF_CC_FILE_ID] or offset + len(body) > len(self.file):
+                return b"", SW_CONDITIONS
+            self.file[offset:offset + len(body)] = body
+            return b"", SW_OK
+        return b"", SW_INS_NOT_SUPPORTED
+
+
+class MockReader:
+    """pyscard-compatible reader with a card always present"""
+
+    def __init__(self, name, card):
+        self.name = name
+        self.card = card
+
+    def createConnection(self):
+        return MockConnection(self.card)
+
+    def __str__(self):
+        return self.name
+
+
+def mock_readers(count, label="mock"):
+    """Return a readers() replacement serving `count` mock readers
+
+    UIDs are derived from `label` and the reader index, so several agents
+    started with different names show distinct, stable cards.
+    """
+    reader_list = []
+    for index in range(count):
+        uid = b"\x04" + hashlib.sha256(f"{label}:{index}".encode()).digest()[:6]
+        card = MockCard(uid, f"{label} reader {index}")
+        reader_list.append(MockReader(f"Mock Reader {label} {index:02d}", card))
+    return lambda: list(reader_list)
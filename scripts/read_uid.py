@@ -5,13 +5,23 @@ Reads NFC card UID using pyscard library
 Supports OneKey Lite card info reading
 """
 
+import io
+import os
 import sys
+import hmac
 import json
+import time
+import socket
+import ssl
+import secrets
+import threading
+import socketserver
+from datetime import datetime, timezone
 
 try:
     from smartcard.System import readers
-    from smartcard.util import toHexString
     from smartcard.Exceptions import NoCardException, CardConnectionException
+    from smartcard.scard import SCARD_RESET_CARD
 except ImportError:
     print(json.dumps({
         "success": False,
@@ -19,13 +29,56 @@ except ImportError:
     }))
     sys.exit(1)
 
-# OneKey Lite APDU Constants
-APDU_SELECT = [0x00, 0xA4, 0x04, 0x00]
-AID_PRIMARY_SAFETY = []  # Select with no data for primary safety
-AID_BACKUP_V1 = [0xD1, 0x56, 0x00, 0x01, 0x32, 0x83, 0x40, 0x01]
-AID_BACKUP_V2 = [0x6F, 0x6E, 0x65, 0x6B, 0x65, 0x79, 0x2E, 0x62, 0x61, 0x63, 0x6B, 0x75, 0x70, 0x01]  # "onekey.backup" + 0x01
-NDEF_APP_AID = "D2760000850101"
-NDEF_CC_FILE_ID = 0xE103
+import apdu
+from apdu import Command, Response, hex_upper, parse_hex
+
+NDEF_APP_AID = hex_upper(apdu.NDEF_APP_AID)
+NDEF_CC_FILE_ID = apdu.NDEF_CC_FILE_ID
+
+# AID scan dictionary (label, AID hex), tried in order after user-supplied AIDs
+KNOWN_AIDS = [
+    ("NDEF", NDEF_APP_AID),
+    ("OneKey Lite V1", "D156000132834001"),
+    ("OneKey Lite V2", "6F6E656B65792E6261636B757001"),
+    ("PPSE", "325041592E5359532E4444463031"),
+    ("PSE", "315041592E5359532E4444463031"),
+    ("Visa", "A0000000031010"),
+    ("Visa Electron", "A0000000032010"),
+    ("Mastercard", "A0000000041010"),
+    ("Maestro", "A0000000043060"),
+    ("American Express", "A00000002501"),
+    ("JCB", "A0000000651010"),
+    ("UnionPay", "A000000333010101"),
+    ("PIV", "A000000308000010000100"),
+    ("OpenPGP", "D27600012401"),
+    ("FIDO U2F", "A0000006472F0001"),
+    ("GlobalPlatform ISD", "A000000151000000"),
+]
+AID_CACHE_FILE = os.environ.get(
+    "NFC_AID_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "aid_cache.json")
+)
+PCSC_STORAGE_CARD_PREFIX = [0x80, 0x4F, 0x0C, 0xA0, 0x00, 0x00, 0x03, 0x06]
+SW_SELECT_UNSUPPORTED = ("6D00", "6E00", "6A81")  # INS/CLA/function not supported
+
+# Session recovery (warm reset + re-select with bounded exponential backoff)
+SESSION_MAX_RETRIES = 4
+SESSION_BACKOFF_BASE = 0.05  # seconds, doubled per attempt
+SESSION_BACKOFF_MAX = 0.8
+TRANSIENT_HRESULTS = {
+    0x80100016,  # SCARD_E_NOT_TRANSACTED
+    0x8010002F,  # SCARD_E_COMM_DATA_LOST
+    0x80100013,  # SCARD_F_COMM_ERROR
+    0x8010000C,  # SCARD_E_NO_SMARTCARD
+    0x80100066,  # SCARD_W_UNRESPONSIVE_CARD
+    0x80100067,  # SCARD_W_UNPOWERED_CARD
+    0x80100068,  # SCARD_W_RESET_CARD
+    0x80100069,  # SCARD_W_REMOVED_CARD
+}
+TRANSIENT_MESSAGES = ("reset", "removed", "unpowered", "unresponsive", "transaction failed", "data lost", "comm")
+# Not resent after a reset: a lost VERIFY may already have spent a PIN try,
+# and a GET RESPONSE chain does not survive the reset
+SESSION_NO_RETRY_INS = {0x20: "VERIFY", 0xC0: "GET RESPONSE"}
+TYPE4_READ_CHUNK = 0xFF
 
 
 def get_readers():
@@ -68,35 +121,15 @@ def read_uid(reader_index=1):
 
         try:
             # Create connection
-            connection = target_reader.createConnection()
+            connection = CardSession(target_reader.createConnection())
             log_event('CONNECT', reader_name, 'Connecting to reader')
             connection.connect()
             log_event('CONNECTED', '', 'Connection established')
             log_connection(connection)
 
-            # Send GET UID command
-            cmd = [0xFF, 0xCA, 0x00, 0x00, 0x00]
-            data, sw1, sw2 = send_apdu(connection, cmd)
-
-            if sw1 == 0x90:
-                uid = toHexString(data)
-                uid_no_space = ''.join(data_byte.to_bytes(1, 'big').hex().upper() for data_byte in data)
-                return {
-                    "success": True,
-                    "uid": uid,
-                    "uid_hex": uid_no_space,
-                    "uid_bytes": data,
-                    "reader": reader_name,
-                    "sw": f"{sw1:02X} {sw2:02X}",
-                    "comm_log": get_comm_log()
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Read failed with status: {sw1:02X} {sw2:02X}",
-                    "reader": reader_name,
-                    "comm_log": get_comm_log()
-                }
+            result = uid_info(connection, reader_name)
+            result["comm_log"] = get_comm_log()
+            return result
 
         except NoCardException:
             return {
@@ -121,37 +154,96 @@ def read_uid(reader_index=1):
         }
 
 
+def uid_info(connection, reader_name):
+    """Read the UID over an open card session"""
+    # Send GET UID command
+    response = transmit(connection, apdu.GET_UID)
+    sw1, sw2 = response.sw1, response.sw2
+
+    if response.ok:
+        return {
+            "success": True,
+            "uid": response.hex(' '),
+            "uid_hex": response.hex(),
+            "uid_bytes": list(response.data),
+            "reader": reader_name,
+            "sw": f"{sw1:02X} {sw2:02X}"
+        }
+    return {
+        "success": False,
+        "error": f"Read failed with status: {sw1:02X} {sw2:02X}",
+        "reader": reader_name
+    }
+
+
 # Global communication log for current session
 comm_log = []
 
+# When set (--stream), events are also handed to event_sink as they happen
+stream_events = False
+
+
+def write_event_line(event):
+    """Default event sink: one NDJSON line on stdout"""
+    sys.stdout.write(json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+
+event_sink = write_event_line
+
+
+def emit_event(event, **fields):
+    """Emit one progress event (stream mode only)"""
+    if stream_events:
+        event_sink(dict(event=event, **fields))
+
 
 def log_event(event_type, data, description=""):
     """Log a communication event"""
-    comm_log.append({
+    entry = {
         'type': event_type,
         'data': data,
         'desc': description
-    })
+    }
+    comm_log.append(entry)
+    emit_event('log', **entry)
+
+
+def redact_command(command, label):
+    """Command hex with the data field replaced by a placeholder"""
+    if len(command) <= 5:
+        return command.hex()
+    return f"{hex_upper(command.raw[:4])} <{label} redacted>"
 
 
-def send_apdu(connection, apdu):
-    """Send APDU and return response, logging the exchange"""
-    apdu_hex = ''.join(f'{b:02X}' for b in apdu)
-    data, sw1, sw2 = connection.transmit(apdu)
-    response_hex = ''.join(f'{b:02X}' for b in data) if data else ''
-    sw_hex = f'{sw1:02X}{sw2:02X}'
+def transmit(connection, command, redact=None):
+    """Send a Command and return a Response, logging the exchange
+
+    redact names the secret carried in the data fields (e.g. "PIN",
+    "backup"): only the APDU header and status word are logged then.
+    """
+    if not isinstance(command, Command):
+        command = Command(command)
+    data, sw1, sw2 = connection.transmit(list(command.raw))
+    response = Response(data, sw1, sw2)
 
     # Log the APDU exchange
-    log_event('TX', apdu_hex, 'APDU Command')
-    log_event('RX', response_hex + sw_hex, f'Response + SW')
+    if redact:
+        rx_data = f"<{redact} redacted> " if response.data else ""
+        log_event('TX', redact_command(command, redact), 'APDU Command')
+        log_event('RX', rx_data + response.sw_hex, 'Response + SW')
+    else:
+        log_event('TX', command.hex(), 'APDU Command')
+        log_event('RX', response.hex() + response.sw_hex, 'Response + SW')
 
-    return data, sw1, sw2
+    return response
 
 
 def clear_comm_log():
-    """Clear the communication log"""
-    global comm_log
+    """Clear the communication log and recovery stats"""
+    global comm_log, recovery_stats
     comm_log = []
+    recovery_stats = new_recovery_stats()
 
 
 def get_comm_log():
@@ -159,13 +251,161 @@ def get_comm_log():
     return comm_log.copy()
 
 
+def new_recovery_stats():
+    """Empty recovery counters for a session"""
+    return {"transient_errors": 0, "recoveries": 0, "failures": 0, "recovery_ms": 0.0}
+
+
+# Recovery counters for current session
+recovery_stats = new_recovery_stats()
+
+
+def get_recovery_stats():
+    """Get current recovery counters"""
+    stats = dict(recovery_stats)
+    stats["recovery_ms"] = round(stats["recovery_ms"], 1)
+    return stats
+
+
+def is_transient_error(error):
+    """Classify a card error as transient (RF glitch) or fatal"""
+    if isinstance(error, NoCardException):
+        return True
+    if not isinstance(error, CardConnectionException):
+        return False
+    hresult = getattr(error, "hresult", None)
+    if isinstance(hresult, int) and hresult not in (0, -1):
+        return (hresult & 0xFFFFFFFF) in TRANSIENT_HRESULTS
+    message = str(error).lower()
+    return any(text in message for text in TRANSIENT_MESSAGES)
+
+
+class CardSession:
+    """Card connection that recovers from transient RF errors
+
+    Drop-in replacement for a pyscard connection: on a transient transmit
+    error it warm-resets the card, replays the SELECTs (and PIN VERIFY)
+    that built the current applet/file/security context and retries the
+    same APDU, so multi-step flows resume from the last completed APDU.
+    """
+
+    def __init__(self, connection, max_retries=None):
+        self.connection = connection
+        self.max_retries = SESSION_MAX_RETRIES if max_retries is None else max_retries
+        self.context = []  # SELECT APDUs to replay after a reset
+        self.verify = None  # VERIFY APDU to replay after the SELECTs
+
+    def connect(self):
+        self.connection.connect()
+
+    def disconnect(self):
+        self.connection.disconnect()
+
+    def getATR(self):
+        return self.connection.getATR()
+
+    def transmit(self, command):
+        attempt = 0
+        error = None  # set while the card still needs a successful recovery
+        while True:
+            if error is None:
+                try:
+                    data, sw1, sw2 = self.connection.transmit(command)
+                    break
+                except (CardConnectionException, NoCardException) as e:
+                    if not is_transient_error(e):
+                        if attempt:
+                            recovery_stats["failures"] += 1
+                        raise
+                    recovery_stats["transient_errors"] += 1
+                    if len(command) > 1 and command[1] in SESSION_NO_RETRY_INS:
+                        log_event('RECOVER', '', f'{e} - {SESSION_NO_RETRY_INS[command[1]]} is not retried')
+                        recovery_stats["failures"] += 1
+                        raise
+                    error = e
+            if attempt >= self.max_retries:
+                if attempt:
+                    recovery_stats["failures"] += 1
+                raise error
+            attempt += 1
+            if self.recover(error, attempt):
+                error = None
+        self.track_context(command, sw1, sw2)
+        return data, sw1, sw2
+
+    def track_context(self, command, sw1, sw2):
+        """Remember the SELECTs and VERIFY needed to get back to the current state"""
+        if len(command) < 4 or sw1 != 0x90:
+            return
+        if command[1] == 0x20:
+            self.verify = list(command)
+        elif command[1] != 0xA4:
+            return
+        elif command[2] == 0x04:
+            self.context = [list(command)]  # applet select resets file and PIN state
+            self.verify = None
+        else:
+            self.context = self.context[:1] + [list(command)]
+
+    def recover(self, error, attempt):
+        """Warm reset the card and replay the applet/file context
+
+        Returns False if the reset or any re-select fails, so the failed
+        APDU is never resent in the wrong applet. A PIN verified before the
+        reset is verified again; if the card rejects it the original error
+        is raised, as further attempts would only spend PIN tries.
+        """
+        start = time.monotonic()
+        delay = min(SESSION_BACKOFF_BASE * (2 ** (attempt - 1)), SESSION_BACKOFF_MAX)
+        log_event('RECOVER', f'{attempt}/{self.max_retries}', f'{error} - warm reset in {delay * 1000:.0f} ms')
+        time.sleep(delay)
+        try:
+            self.warm_reset()
+            for command in self.context:
+                data, sw1, sw2 = self.connection.transmit(command)
+                log_event('RESELECT', hex_upper(bytes(command)), f'SW={format_sw(sw1, sw2)}')
+                if sw1 != 0x90:
+                    log_event('RECOVER', '', f'Re-select failed: {format_sw(sw1, sw2)}')
+                    return False
+            rejected = None
+            if self.verify is not None:
+                data, sw1, sw2 = self.connection.transmit(self.verify)
+                log_event('REVERIFY', redact_command(Command(self.verify), 'PIN'), f'SW={format_sw(sw1, sw2)}')
+                if sw1 != 0x90:
+                    rejected = format_sw(sw1, sw2)
+            if rejected is None:
+                recovery_stats["recoveries"] += 1
+                return True
+        except (CardConnectionException, NoCardException) as e:
+            log_event('RECOVER', '', f'Recovery attempt failed: {e}')
+            return False
+        finally:
+            recovery_stats["recovery_ms"] += (time.monotonic() - start) * 1000
+        log_event('RECOVER', '', f'PIN re-verify failed: {rejected}')
+        recovery_stats["failures"] += 1
+        raise error
+
+    def warm_reset(self):
+        """SCardReconnect with reset, falling back to disconnect + connect"""
+        try:
+            self.connection.reconnect(disposition=SCARD_RESET_CARD)
+            return
+        except (AttributeError, TypeError, CardConnectionException):
+            pass
+        try:
+            self.connection.disconnect()
+        except Exception:
+            pass
+        self.connection.connect()
+
+
 def log_connection(connection):
     """Log connection establishment details"""
     try:
         # Get ATR (Answer To Reset)
         atr = connection.getATR()
         if atr:
-            atr_hex = ''.join(f'{b:02X}' for b in atr)
+            atr_hex = hex_upper(bytes(atr))
             log_event('ATR', atr_hex, 'Answer To Reset')
     except Exception:
         pass
@@ -188,62 +428,54 @@ def normalize_hex_string(hex_str):
 
 def select_primary_safety(connection):
     """Select primary safety domain"""
-    apdu = APDU_SELECT + [0x00]  # Lc = 0
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    return sw1 == 0x90, format_sw(sw1, sw2), data
+    response = transmit(connection, apdu.SELECT_PRIMARY_SAFETY)
+    return response.ok, response.sw_hex, response.data
 
 
 def select_backup_applet(connection, version):
     """Select backup applet (V1 or V2)"""
-    aid = AID_BACKUP_V1 if version == "v1" else AID_BACKUP_V2
-    apdu = APDU_SELECT + [len(aid)] + aid
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    return sw1 == 0x90, format_sw(sw1, sw2), data
+    response = transmit(connection, apdu.SELECT_BACKUP_V1 if version == "v1" else apdu.SELECT_BACKUP_V2)
+    return response.ok, response.sw_hex, response.data
 
 
 def get_device_certificate(connection):
     """Get device certificate"""
-    apdu = [0x80, 0xCA, 0xBF, 0x21, 0x06, 0xA6, 0x04, 0x83, 0x02, 0x15, 0x18, 0x00]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    if sw1 == 0x90:
-        return True, format_sw(sw1, sw2), toHexString(data)
-    return False, format_sw(sw1, sw2), None
+    response = transmit(connection, apdu.GET_DEVICE_CERTIFICATE)
+    if response.ok:
+        return True, response.sw_hex, response.hex(' ')
+    return False, response.sw_hex, None
 
 
 def get_backup_status(connection):
     """Get backup status"""
-    apdu = [0x80, 0x6A, 0x00, 0x00, 0x00]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    if sw1 == 0x90 and len(data) > 0:
-        return True, format_sw(sw1, sw2), data[0]
-    return sw1 == 0x90, format_sw(sw1, sw2), None
+    response = transmit(connection, apdu.GET_BACKUP_STATUS)
+    if response.ok and response.data:
+        return True, response.sw_hex, response.data[0]
+    return response.ok, response.sw_hex, None
 
 
 def get_pin_status(connection):
     """Get PIN status"""
-    apdu = [0x80, 0xCB, 0x80, 0x00, 0x05, 0xDF, 0xFF, 0x02, 0x81, 0x05, 0x00]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    if sw1 == 0x90 and len(data) > 0:
-        return True, format_sw(sw1, sw2), data[0]
-    return sw1 == 0x90, format_sw(sw1, sw2), None
+    response = transmit(connection, apdu.GET_PIN_STATUS)
+    if response.ok and response.data:
+        return True, response.sw_hex, response.data[0]
+    return response.ok, response.sw_hex, None
 
 
 def get_serial_number(connection):
     """Get serial number"""
-    apdu = [0x80, 0xCB, 0x80, 0x00, 0x05, 0xDF, 0xFF, 0x02, 0x81, 0x01, 0x00]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    if sw1 == 0x90 and len(data) > 0:
-        return True, format_sw(sw1, sw2), toHexString(data)
-    return sw1 == 0x90, format_sw(sw1, sw2), None
+    response = transmit(connection, apdu.GET_SERIAL_NUMBER)
+    if response.ok and response.data:
+        return True, response.sw_hex, response.hex(' ')
+    return response.ok, response.sw_hex, None
 
 
 def get_pin_retry_count(connection):
     """Get PIN retry count"""
-    apdu = [0x80, 0xCB, 0x80, 0x00, 0x05, 0xDF, 0xFF, 0x02, 0x81, 0x02, 0x00]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    if sw1 == 0x90 and len(data) > 0:
-        return True, format_sw(sw1, sw2), data[0]
-    return sw1 == 0x90, format_sw(sw1, sw2), None
+    response = transmit(connection, apdu.GET_PIN_RETRY_COUNT)
+    if response.ok and response.data:
+        return True, response.sw_hex, response.data[0]
+    return response.ok, response.sw_hex, None
 
 
 def interpret_backup_status(status_byte, version):
@@ -266,6 +498,90 @@ def interpret_pin_status(status_byte, version):
         return "not_set" if status_byte == 0x02 else "set" if status_byte == 0x01 else "unknown"
 
 
+def lite_info(connection, reader_name, version="v2"):
+    """Read all OneKey Lite card info over an open card session"""
+    result = {
+        "success": True,
+        "reader": reader_name,
+        "version": version,
+        "serial_number": None,
+        "pin_status": None,
+        "pin_status_raw": None,
+        "backup_status": None,
+        "backup_status_raw": None,
+        "pin_retry_count": None,
+        "certificate": None,
+        "errors": []
+    }
+
+    # Get certificate first (card starts in primary safety context)
+    ok, sw, cert = get_device_certificate(connection)
+    if ok:
+        result["certificate"] = cert
+    else:
+        result["errors"].append(f"get_certificate failed: {sw}")
+
+    # For V1: select primary safety then get pin_status, serial_number, pin_retry
+    if version == "v1":
+        ok, sw, _ = select_primary_safety(connection)
+        if not ok:
+            result["errors"].append(f"select_primary_safety failed: {sw}")
+        else:
+            ok, sw, val = get_pin_status(connection)
+            if ok:
+                result["pin_status_raw"] = val
+                result["pin_status"] = interpret_pin_status(val, version)
+            else:
+                result["errors"].append(f"get_pin_status failed: {sw}")
+
+            ok, sw, val = get_serial_number(connection)
+            if ok:
+                result["serial_number"] = val
+            else:
+                result["errors"].append(f"get_serial_number failed: {sw}")
+
+            ok, sw, val = get_pin_retry_count(connection)
+            if ok:
+                result["pin_retry_count"] = val
+            elif sw != "6985":  # 6985 = PIN not set, retry count N/A
+                result["errors"].append(f"get_pin_retry_count failed: {sw}")
+
+    # Select backup applet
+    ok, sw, _ = select_backup_applet(connection, version)
+    if not ok:
+        result["errors"].append(f"select_backup_applet failed: {sw}")
+    else:
+        # Get backup status (always from backup applet context)
+        ok, sw, val = get_backup_status(connection)
+        if ok:
+            result["backup_status_raw"] = val
+            result["backup_status"] = interpret_backup_status(val, version)
+        else:
+            result["errors"].append(f"get_backup_status failed: {sw}")
+
+        # For V2: get pin_status, serial_number, pin_retry from backup applet
+        if version == "v2":
+            ok, sw, val = get_pin_status(connection)
+            if ok:
+                result["pin_status_raw"] = val
+                result["pin_status"] = interpret_pin_status(val, version)
+            else:
+                result["errors"].append(f"get_pin_status failed: {sw}")
+
+            ok, sw, val = get_serial_number(connection)
+            if ok:
+                result["serial_number"] = val
+            else:
+                result["errors"].append(f"get_serial_number failed: {sw}")
+
+            ok, sw, val = get_pin_retry_count(connection)
+            if ok:
+                result["pin_retry_count"] = val
+            elif sw != "6985":  # 6985 = PIN not set, retry count N/A
+                result["errors"].append(f"get_pin_retry_count failed: {sw}")
+    return result
+
+
 def get_lite_info(reader_index=1, version="v2"):
     """Get all OneKey Lite card info"""
     clear_comm_log()
@@ -281,92 +597,13 @@ def get_lite_info(reader_index=1, version="v2"):
         reader_name = str(target_reader)
 
         try:
-            connection = target_reader.createConnection()
+            connection = CardSession(target_reader.createConnection())
             log_event('CONNECT', reader_name, 'Connecting to reader')
             connection.connect()
             log_event('CONNECTED', '', 'Connection established')
             log_connection(connection)
 
-            result = {
-                "success": True,
-                "reader": reader_name,
-                "version": version,
-                "serial_number": None,
-                "pin_status": None,
-                "pin_status_raw": None,
-                "backup_status": None,
-                "backup_status_raw": None,
-                "pin_retry_count": None,
-                "certificate": None,
-                "errors": []
-            }
-
-            # Get certificate first (card starts in primary safety context)
-            ok, sw, cert = get_device_certificate(connection)
-            if ok:
-                result["certificate"] = cert
-            else:
-                result["errors"].append(f"get_certificate failed: {sw}")
-
-            # For V1: select primary safety then get pin_status, serial_number, pin_retry
-            if version == "v1":
-                ok, sw, _ = select_primary_safety(connection)
-                if not ok:
-                    result["errors"].append(f"select_primary_safety failed: {sw}")
-                else:
-                    ok, sw, val = get_pin_status(connection)
-                    if ok:
-                        result["pin_status_raw"] = val
-                        result["pin_status"] = interpret_pin_status(val, version)
-                    else:
-                        result["errors"].append(f"get_pin_status failed: {sw}")
-
-                    ok, sw, val = get_serial_number(connection)
-                    if ok:
-                        result["serial_number"] = val
-                    else:
-                        result["errors"].append(f"get_serial_number failed: {sw}")
-
-                    ok, sw, val = get_pin_retry_count(connection)
-                    if ok:
-                        result["pin_retry_count"] = val
-                    elif sw != "6985":  # 6985 = PIN not set, retry count N/A
-                        result["errors"].append(f"get_pin_retry_count failed: {sw}")
-
-            # Select backup applet
-            ok, sw, _ = select_backup_applet(connection, version)
-            if not ok:
-                result["errors"].append(f"select_backup_applet failed: {sw}")
-            else:
-                # Get backup status (always from backup applet context)
-                ok, sw, val = get_backup_status(connection)
-                if ok:
-                    result["backup_status_raw"] = val
-                    result["backup_status"] = interpret_backup_status(val, version)
-                else:
-                    result["errors"].append(f"get_backup_status failed: {sw}")
-
-                # For V2: get pin_status, serial_number, pin_retry from backup applet
-                if version == "v2":
-                    ok, sw, val = get_pin_status(connection)
-                    if ok:
-                        result["pin_status_raw"] = val
-                        result["pin_status"] = interpret_pin_status(val, version)
-                    else:
-                        result["errors"].append(f"get_pin_status failed: {sw}")
-
-                    ok, sw, val = get_serial_number(connection)
-                    if ok:
-                        result["serial_number"] = val
-                    else:
-                        result["errors"].append(f"get_serial_number failed: {sw}")
-
-                    ok, sw, val = get_pin_retry_count(connection)
-                    if ok:
-                        result["pin_retry_count"] = val
-                    elif sw != "6985":  # 6985 = PIN not set, retry count N/A
-                        result["errors"].append(f"get_pin_retry_count failed: {sw}")
-
+            result = lite_info(connection, reader_name, version)
             result["comm_log"] = get_comm_log()
             return result
 
@@ -394,24 +631,24 @@ def send_raw_apdu(reader_index=1, apdu_hex=""):
         reader_name = str(target_reader)
 
         try:
-            apdu = [int(apdu_hex[i:i+2], 16) for i in range(0, len(apdu_hex), 2)]
+            command = Command.from_hex(apdu_hex)
         except ValueError:
             return {"success": False, "error": "Invalid APDU hex string", "comm_log": get_comm_log()}
 
         try:
-            connection = target_reader.createConnection()
+            connection = CardSession(target_reader.createConnection())
             log_event('CONNECT', reader_name, 'Connecting to reader')
             connection.connect()
             log_event('CONNECTED', '', 'Connection established')
             log_connection(connection)
 
-            data, sw1, sw2 = send_apdu(connection, apdu)
+            response = transmit(connection, command)
             return {
                 "success": True,
                 "reader": reader_name,
-                "apdu": apdu_hex.upper(),
-                "response": toHexString(data) if data else "",
-                "sw": format_sw(sw1, sw2),
+                "apdu": command.hex(),
+                "response": response.hex(' '),
+                "sw": response.sw_hex,
                 "comm_log": get_comm_log()
             }
 
@@ -424,22 +661,402 @@ def send_raw_apdu(reader_index=1, apdu_hex=""):
         return {"success": False, "error": str(e), "comm_log": get_comm_log()}
 
 
+# OneKey Lite Business Flows (verify / backup / restore)
+#
+# The documented flows open a GlobalPlatform secure channel with OneKey's
+# native library before verify_pin / setup_new_pin / reset_card (and V2
+# backup/export). That library is not part of this tool, so the commands
+# are sent in plain form; cards enforcing the channel answer 6982.
+LITE_ERRORS = {
+    2001: "ConnectionFailException",
+    3001: "PasswordWrongException",
+    3002: "InputPasswordEmptyException",
+    3003: "PasswordEmptyException",
+    3004: "InitPasswordException",
+    3005: "CardLockException",
+    3006: "UpperErrorAutoResetException",
+    4000: "ExecFailureException",
+    4001: "InitializedException",
+    4002: "NotInitializedException",
+}
+LITE_PIN_LENGTH = 6
+
+
+class LiteError(Exception):
+    """OneKey Lite flow failure carrying a documented error code"""
+
+    def __init__(self, code, message, **extra):
+        super().__init__(message)
+        self.code = code
+        self.extra = extra
+
+    def to_result(self):
+        result = {
+            "success": False,
+            "error": f"{LITE_ERRORS.get(self.code, 'LiteError')}: {self}",
+            "error_code": self.code,
+        }
+        result.update(self.extra)
+        return result
+
+
+def encode_pin(pin):
+    """Encode a 6-digit PIN as one byte per digit"""
+    if not pin:
+        raise LiteError(3002, "PIN is empty")
+    if len(pin) != LITE_PIN_LENGTH or not pin.isdigit():
+        raise LiteError(3002, f"PIN must be {LITE_PIN_LENGTH} digits")
+    return bytes(int(digit) for digit in pin)
+
+
+def lite_transmit(connection, command, redact=None):
+    """Send APDU, following 61xx (GET RESPONSE) and 6Cxx (wrong Le) into one buffer"""
+    response = transmit(connection, command, redact)
+    if response.sw1 == 0x6C:
+        response = transmit(connection, command.raw[:-1] + bytes((response.sw2,)), redact)
+    payload = bytearray(response.data)
+    while response.sw1 == 0x61:
+        response = transmit(connection, apdu.get_response_command(response.sw2), redact)
+        payload += response.data
+    return payload, response.sw1, response.sw2
+
+
+def lite_select(connection, version, applet, state):
+    """Select 'primary' or 'backup' applet, skipping the APDU if already there"""
+    if state.get("applet") == applet:
+        return
+    if applet == "primary":
+        ok, sw, _ = select_primary_safety(connection)
+    else:
+        ok, sw, _ = select_backup_applet(connection, version)
+    if not ok:
+        raise LiteError(4000, f"select_{applet} failed: {sw}")
+    state["applet"] = applet
+    state["switches"] = state.get("switches", 0) + 1
+
+
+def verify_pin(connection, pin_bytes):
+    """Verify PIN"""
+    response = transmit(connection, Command.build(0x80, 0x20, 0x00, 0x00, bytes((len(pin_bytes),)) + pin_bytes), "PIN")
+    return response.ok, response.sw_hex, response.data
+
+
+def setup_new_pin(connection, pin_bytes):
+    """Set (or reset) PIN - clears backup content"""
+    command1 = bytes((0x00, len(pin_bytes))) + pin_bytes
+    command2 = bytes((0x82, 0x04, len(command1))) + command1
+    payload = bytes((0xDF, 0xFE, len(command2))) + command2
+    response = transmit(connection, Command.build(0x80, 0xCB, 0x80, 0x00, payload), "PIN")
+    return response.ok, response.sw_hex, response.data
+
+
+def reset_card(connection):
+    """Reset card (clears PIN and backup)"""
+    response = transmit(connection, apdu.RESET_CARD)
+    return response.ok, response.sw_hex, response.data
+
+
+def backup_data(connection, payload):
+    """Store backup payload (extended Lc above 255 bytes)"""
+    response = transmit(connection, Command.build(0x80, 0x3B, 0x00, 0x00, payload), "backup")
+    return response.ok, response.sw_hex, response.data
+
+
+def export_data(connection):
+    """Export backup payload as bytes"""
+    payload, sw1, sw2 = lite_transmit(connection, apdu.EXPORT_DATA, "backup")
+    return sw1 == 0x90, format_sw(sw1, sw2), bytes(payload)
+
+
+def lite_pin_status(connection, version, state):
+    """Read PIN status from the applet that serves it for this version"""
+    lite_select(connection, version, "primary" if version == "v1" else "backup", state)
+    ok, sw, val = get_pin_status(connection)
+    if not ok:
+        raise LiteError(4000, f"get_pin_status failed: {sw}")
+    return interpret_pin_status(val, version)
+
+
+def lite_backup_status(connection, version, state):
+    """Read backup status from the backup applet"""
+    lite_select(connection, version, "backup", state)
+    ok, sw, val = get_backup_status(connection)
+    if not ok:
+        raise LiteError(4000, f"get_backup_status failed: {sw}")
+    return interpret_backup_status(val, version)
+
+
+def lite_handle_locked(connection, version, state, auto_reset):
+    """PIN locked: reset the card if allowed, as the documented flow does"""
+    if not auto_reset:
+        raise LiteError(3005, "PIN retry count exhausted, card locked", pin_retry_count=0)
+    lite_select(connection, version, "primary" if version == "v1" else "backup", state)
+    ok, sw, _ = reset_card(connection)
+    if not ok:
+        raise LiteError(3005, f"Card locked and reset_card failed: {sw}", pin_retry_count=0)
+    raise LiteError(3006, "Card locked and was reset automatically")
+
+
+def lite_verify_pin(connection, version, pin_bytes, state, auto_reset=False):
+    """verify_pin with the documented SW handling (6983, 63Cx, retry count)"""
+    lite_select(connection, version, "backup", state)
+    ok, sw, _ = verify_pin(connection, pin_bytes)
+    if ok:
+        return
+    if sw == "6983":
+        lite_handle_locked(connection, version, state, auto_reset)
+    if sw.startswith("63C"):
+        retries = int(sw[3], 16)
+        raise LiteError(3001, f"Wrong PIN, {retries} retries left", pin_retry_count=retries)
+    if sw == "6982":
+        raise LiteError(4000, "verify_pin rejected: secure channel required (6982)")
+
+    lite_select(connection, version, "primary" if version == "v1" else "backup", state)
+    ok, retry_sw, retries = get_pin_retry_count(connection)
+    if ok and retries == 0:
+        lite_handle_locked(connection, version, state, auto_reset)
+    raise LiteError(3001, f"verify_pin failed: {sw}", pin_retry_count=retries if ok else None)
+
+
+def lite_verify_flow(connection, version, pin, auto_reset=False, **_):
+    """PIN verification flow"""
+    pin_bytes = encode_pin(pin)
+    state = {}
+    if lite_pin_status(connection, version, state) == "not_set":
+        raise LiteError(3003, "PIN has not been set")
+    lite_verify_pin(connection, version, pin_bytes, state, auto_reset)
+    return {"verified": True, "applet_switches": state.get("switches", 0)}
+
+
+def lite_backup_flow(connection, version, pin, payload=b"", overwrite=False, auto_reset=False, **_):
+    """Backup flow: guard existing backup, set up PIN, verify, store payload"""
+    pin_bytes = encode_pin(pin)
+    if not payload:
+        raise LiteError(4000, "Backup data is empty")
+    state = {}
+    pin_status = lite_pin_status(connection, version, state)
+
+    # V1 sets the PIN in primary safety before moving to the backup applet
+    if version == "v1" and pin_status == "not_set":
+        ok, sw, _ = setup_new_pin(connection, pin_bytes)
+        if not ok:
+            raise LiteError(3004, f"setup_new_pin failed: {sw}")
+
+    backup_status = lite_backup_status(connection, version, state)
+    if backup_status == "has_backup" and not overwrite:
+        raise LiteError(4001, "Card already holds a backup (use overwrite)")
+
+    if version == "v2":
+        if backup_status == "has_backup" and overwrite:
+            lite_verify_pin(connection, version, pin_bytes, state, auto_reset)
+            ok, sw, _ = setup_new_pin(connection, pin_bytes)
+            if not ok:
+                raise LiteError(3004, f"setup_new_pin (clear) failed: {sw}")
+        elif pin_status == "not_set":
+            ok, sw, _ = setup_new_pin(connection, pin_bytes)
+            if not ok:
+                raise LiteError(3004, f"setup_new_pin failed: {sw}")
+
+    lite_verify_pin(connection, version, pin_bytes, state, auto_reset)
+    ok, sw, _ = backup_data(connection, payload)
+    if not ok:
+        raise LiteError(4000, f"backup_data failed: {sw}")
+    return {"bytes": len(payload), "overwritten": backup_status == "has_backup",
+            "applet_switches": state.get("switches", 0)}
+
+
+def lite_restore_flow(connection, version, pin, out_path=None, auto_reset=False, **_):
+    """Restore flow: check backup exists, verify PIN, export payload"""
+    pin_bytes = encode_pin(pin)
+    state = {}
+    if lite_pin_status(connection, version, state) == "not_set":
+        raise LiteError(3003, "PIN has not been set")
+    if lite_backup_status(connection, version, state) != "has_backup":
+        raise LiteError(4002, "Card holds no backup")
+    lite_verify_pin(connection, version, pin_bytes, state, auto_reset)
+    ok, sw, payload = export_data(connection)
+    if not ok:
+        raise LiteError(4000, f"export_data failed: {sw}")
+    if not payload:
+        raise LiteError(4002, "Exported backup is empty")
+
+    result = {"bytes": len(payload), "applet_switches": state.get("switches", 0)}
+    if out_path:
+        write_binary(out_path, payload)
+        result["out"] = out_path
+    else:
+        result["data"] = hex_upper(payload)
+    return result
+
+
+def read_binary(path):
+    """Read payload bytes from a file ('-' = stdin)"""
+    if path == "-":
+        return sys.stdin.buffer.read()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def write_binary(path, payload):
+    """Write payload bytes to a file"""
+    with open(path, "wb") as f:
+        f.write(payload)
+
+
+LITE_FLOWS = {
+    "verify": lite_verify_flow,
+    "backup": lite_backup_flow,
+    "restore": lite_restore_flow,
+}
+
+
+def lite_run(reader_index=1, version="v2", action="verify", **kwargs):
+    """Run a OneKey Lite business flow in a single card session"""
+    clear_comm_log()
+    try:
+        r_list = readers()
+        if len(r_list) == 0:
+            return {"success": False, "error": "No NFC readers found", "comm_log": get_comm_log()}
+
+        if reader_index >= len(r_list):
+            reader_index = 0
+
+        target_reader = r_list[reader_index]
+        reader_name = str(target_reader)
+
+        try:
+            connection = CardSession(target_reader.createConnection())
+            log_event('CONNECT', reader_name, 'Connecting to reader')
+            connection.connect()
+            log_event('CONNECTED', '', 'Connection established')
+            log_connection(connection)
+
+            result = {"success": True, "reader": reader_name, "version": version, "action": action}
+            try:
+                result.update(LITE_FLOWS[action](connection, version, **kwargs))
+            except LiteError as e:
+                result.update(e.to_result())
+            result["comm_log"] = get_comm_log()
+            return result
+
+        except NoCardException:
+            return {"success": False, "error": "No card present - please place card on reader", "reader": reader_name, "comm_log": get_comm_log()}
+        except CardConnectionException as e:
+            return {"success": False, "error": f"Card connection error: {str(e)}", "error_code": 2001, "reader": reader_name, "comm_log": get_comm_log()}
+
+    except Exception as e:
+        return {"success": False, "error": str(e), "comm_log": get_comm_log()}
+
+
+def wait_for_card(reader_index, present=True, timeout=30.0, interval=0.2):
+    """Poll the reader until a card is present (or removed); False on timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        r_list = readers()
+        if r_list:
+            target_reader = r_list[reader_index if reader_index < len(r_list) else 0]
+            connection = target_reader.createConnection()
+            try:
+                connection.connect()
+                connection.disconnect()
+                found = True
+            except (NoCardException, CardConnectionException):
+                found = False
+            if found == present:
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def lite_batch(reader_index=1, version="v2", action="verify", count=0, wait=30.0, out_path=None, **kwargs):
+    """Run a Lite flow on a queue of cards, one per tap, with per-card timing
+
+    count=0 keeps going until no new card arrives within `wait` seconds.
+    `out_path` may contain '{index}' so each restored card gets its own file.
+    Each card must be removed before the next one is processed; a card left
+    on the reader for `wait` seconds stops the batch rather than being
+    processed again.
+    """
+    if out_path:
+        try:
+            out_path.format(index=1)
+        except (KeyError, IndexError, ValueError) as e:
+            return {"success": False, "error": f"Invalid output path template (only '{{index}}' is supported): {e!r}"}
+
+    cards = []
+    stopped = None
+    batch_start = time.monotonic()
+    try:
+        while count == 0 or len(cards) < count:
+            if not wait_for_card(reader_index, True, wait):
+                break
+            index = len(cards) + 1
+            card_out = out_path.format(index=index) if out_path else None
+            start = time.monotonic()
+            result = lite_run(reader_index, version, action, out_path=card_out, **kwargs)
+            result["index"] = index
+            result["elapsed_ms"] = round((time.monotonic() - start) * 1000, 1)
+            result["recovery"] = get_recovery_stats()
+            if stream_events:
+                result.pop("comm_log", None)  # already streamed as log events
+                emit_event('card', result=result)
+            cards.append(result)
+            if count and len(cards) >= count:
+                break
+            if not wait_for_card(reader_index, False, wait):
+                stopped = f"Card {index} was not removed within {wait:g} s, batch stopped"
+                break
+    except Exception as e:
+        stopped = f"Reader error, batch stopped: {e}"
+
+    succeeded = sum(1 for card in cards if card.get("success"))
+    # Each card session resets the counters, so the batch total is summed here
+    recovery = new_recovery_stats()
+    for card in cards:
+        for key, value in card["recovery"].items():
+            recovery[key] += value
+    recovery["recovery_ms"] = round(recovery["recovery_ms"], 1)
+    result = {
+        "success": succeeded == len(cards) and len(cards) > 0 and not stopped,
+        "version": version,
+        "action": action,
+        "processed": len(cards),
+        "succeeded": succeeded,
+        "total_ms": round((time.monotonic() - batch_start) * 1000, 1),
+        "cards": cards,
+        "recovery": recovery
+    }
+    if stopped:
+        result["error"] = stopped
+    elif not cards:
+        result["error"] = "No card presented"
+    elif succeeded < len(cards):
+        result["error"] = f"{len(cards) - succeeded} of {len(cards)} cards failed"
+    return result
+
+
 # Type 4 Card Functions
 def type4_select(connection, aid_hex):
     """Select application by AID"""
+    aid_hex = normalize_hex_string(aid_hex)
+    if not aid_hex:
+        return False, "0000", "Empty AID"
+    if len(aid_hex) % 2 != 0:
+        return False, "0000", "Invalid AID length"
     try:
-        aid_hex = normalize_hex_string(aid_hex)
-        if not aid_hex:
-            return False, "0000", "Empty AID"
-        if len(aid_hex) % 2 != 0:
-            return False, "0000", "Invalid AID length"
-        aid = [int(aid_hex[i:i+2], 16) for i in range(0, len(aid_hex), 2)]
+        aid = bytes.fromhex(aid_hex)
     except ValueError:
         return False, "0000", "Invalid AID hex"
-    apdu = [0x00, 0xA4, 0x04, 0x00, len(aid)] + aid + [0x00]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    response = toHexString(data) if data else ""
-    return sw1 == 0x90, format_sw(sw1, sw2), response
+    ok, sw, data = type4_select_bytes(connection, aid)
+    return ok, sw, data.hex(' ').upper()
+
+
+def type4_select_bytes(connection, aid):
+    """Select application by AID (raw bytes)"""
+    command = apdu.SELECT_NDEF_APP if aid == apdu.NDEF_APP_AID else apdu.select_aid_command(aid)
+    response = transmit(connection, command)
+    return response.ok, response.sw_hex, response.data
 
 
 def type4_select_with_fallback(connection, aid_hex):
@@ -456,60 +1073,54 @@ def type4_select_with_fallback(connection, aid_hex):
     return ok, sw, response, aid_hex, False
 
 
-def type4_read(connection, offset, length):
-    """Read data from card"""
-    offset_hi = (offset >> 8) & 0xFF
-    offset_lo = offset & 0xFF
-    apdu = [0x00, 0xB0, offset_hi, offset_lo, length]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    response = toHexString(data) if data else ""
-    return sw1 == 0x90, format_sw(sw1, sw2), response
-
-
 def type4_read_bytes(connection, offset, length):
     """Read data from card (raw bytes)"""
-    offset_hi = (offset >> 8) & 0xFF
-    offset_lo = offset & 0xFF
-    apdu = [0x00, 0xB0, offset_hi, offset_lo, length]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    return sw1 == 0x90, format_sw(sw1, sw2), data
+    response = transmit(connection, apdu.read_binary_command(offset, length))
+    return response.ok, response.sw_hex, response.data
+
+
+def type4_read_chunked(connection, offset, length):
+    """Read data from card in TYPE4_READ_CHUNK pieces"""
+    chunks = bytearray()
+    sw = "9000"
+    position, remaining = offset, length
+    while remaining > 0:
+        ok, sw, data = type4_read_bytes(connection, position, min(remaining, TYPE4_READ_CHUNK))
+        if not ok:
+            return False, sw, chunks.hex(' ').upper()
+        if not data:
+            break
+        emit_event('data', offset=position, data=data.hex(' ').upper())
+        chunks += data
+        position += len(data)
+        remaining -= len(data)
+    return True, sw, chunks.hex(' ').upper()
 
 
 def type4_write(connection, offset, data_hex):
     """Write data to card"""
     try:
-        write_data = [int(data_hex[i:i+2], 16) for i in range(0, len(data_hex), 2)]
+        write_data = parse_hex(data_hex)
     except ValueError:
         return False, "0000", "Invalid data hex"
-    offset_hi = (offset >> 8) & 0xFF
-    offset_lo = offset & 0xFF
-    apdu = [0x00, 0xD0, offset_hi, offset_lo, len(write_data)] + write_data
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    response = toHexString(data) if data else ""
-    return sw1 == 0x90, format_sw(sw1, sw2), response
+    response = transmit(connection, apdu.write_binary_command(offset, write_data))
+    return response.ok, response.sw_hex, response.hex(' ')
 
 
 def type4_update_binary(connection, offset, data_hex):
     """Update binary (ISO 7816-4)"""
     try:
-        write_data = [int(data_hex[i:i+2], 16) for i in range(0, len(data_hex), 2)]
+        write_data = parse_hex(data_hex)
     except ValueError:
         return False, "0000", "Invalid data hex"
-    offset_hi = (offset >> 8) & 0xFF
-    offset_lo = offset & 0xFF
-    apdu = [0x00, 0xD6, offset_hi, offset_lo, len(write_data)] + write_data
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    response = toHexString(data) if data else ""
-    return sw1 == 0x90, format_sw(sw1, sw2), response
+    response = transmit(connection, apdu.update_binary_command(offset, write_data))
+    return response.ok, response.sw_hex, response.hex(' ')
 
 
 def type4_select_file(connection, file_id):
     """Select file by File ID"""
-    fid = file_id & 0xFFFF
-    apdu = [0x00, 0xA4, 0x00, 0x0C, 0x02, (fid >> 8) & 0xFF, fid & 0xFF]
-    data, sw1, sw2 = send_apdu(connection, apdu)
-    response = toHexString(data) if data else ""
-    return sw1 == 0x90, format_sw(sw1, sw2), response
+    response = transmit(connection, apdu.select_file_command(file_id))
+    return response.ok, response.sw_hex, response.hex(' ')
 
 
 def type4_get_ndef_file_id(connection):
@@ -522,10 +1133,42 @@ def type4_get_ndef_file_id(connection):
         return False, sw, None
     if cc is None or len(cc) < 11:
         return False, sw, None
-    fid = (cc[9] << 8) | cc[10]
+    fid = int.from_bytes(memoryview(cc)[9:11], "big")
     return True, "9000", fid
 
 
+def type4_info(connection, reader_name, aid_hex=NDEF_APP_AID):
+    """Read Type 4 card info over an open card session - select app and read basic info"""
+    # Get ATR
+    atr = connection.getATR()
+    atr_hex = hex_upper(bytes(atr or []), " ")
+
+    # Get UID
+    response = transmit(connection, apdu.GET_UID)
+    uid = response.hex(' ') if response.ok else ""
+
+    result = {
+        "success": True,
+        "reader": reader_name,
+        "atr": atr_hex,
+        "uid": uid,
+        "aid": aid_hex.upper() if aid_hex else "",
+        "selected": False,
+        "select_sw": "",
+        "select_response": ""
+    }
+
+    # Select application
+    ok, sw, response, used_aid, fallback_used = type4_select_with_fallback(connection, aid_hex)
+    result["selected"] = ok
+    result["select_sw"] = sw
+    result["select_response"] = response
+    result["aid"] = used_aid
+    result["aid_requested"] = normalize_hex_string(aid_hex)
+    result["aid_fallback"] = fallback_used
+    return result
+
+
 def get_type4_info(reader_index=1, aid_hex=NDEF_APP_AID):
     """Get Type 4 card info - select app and read basic info"""
     clear_comm_log()
@@ -541,40 +1184,13 @@ def get_type4_info(reader_index=1, aid_hex=NDEF_APP_AID):
         reader_name = str(target_reader)
 
         try:
-            connection = target_reader.createConnection()
+            connection = CardSession(target_reader.createConnection())
             log_event('CONNECT', reader_name, 'Connecting to reader')
             connection.connect()
             log_event('CONNECTED', '', 'Connection established')
             log_connection(connection)
 
-            # Get ATR
-            atr = connection.getATR()
-            atr_hex = toHexString(atr) if atr else ""
-
-            # Get UID
-            cmd = [0xFF, 0xCA, 0x00, 0x00, 0x00]
-            data, sw1, sw2 = send_apdu(connection, cmd)
-            uid = toHexString(data) if sw1 == 0x90 and data else ""
-
-            result = {
-                "success": True,
-                "reader": reader_name,
-                "atr": atr_hex,
-                "uid": uid,
-                "aid": aid_hex.upper() if aid_hex else "",
-                "selected": False,
-                "select_sw": "",
-                "select_response": ""
-            }
-
-            # Select application
-            ok, sw, response, used_aid, fallback_used = type4_select_with_fallback(connection, aid_hex)
-            result["selected"] = ok
-            result["select_sw"] = sw
-            result["select_response"] = response
-            result["aid"] = used_aid
-            result["aid_requested"] = normalize_hex_string(aid_hex)
-            result["aid_fallback"] = fallback_used
+            result = type4_info(connection, reader_name, aid_hex)
             result["comm_log"] = get_comm_log()
 
             return result
@@ -603,7 +1219,7 @@ def type4_operation(reader_index=1, operation="read", aid_hex=NDEF_APP_AID, offs
         reader_name = str(target_reader)
 
         try:
-            connection = target_reader.createConnection()
+            connection = CardSession(target_reader.createConnection())
             log_event('CONNECT', reader_name, 'Connecting to reader')
             connection.connect()
             log_event('CONNECTED', '', 'Connection established')
@@ -650,7 +1266,7 @@ def type4_operation(reader_index=1, operation="read", aid_hex=NDEF_APP_AID, offs
                         result["error"] = f"Select NDEF file failed: SW={sw}"
                         result["comm_log"] = get_comm_log()
                         return result
-                ok, sw, data = type4_read(connection, offset, length)
+                ok, sw, data = type4_read_chunked(connection, offset, length)
                 result["operation_ok"] = ok
                 result["operation_sw"] = sw
                 result["data"] = data
@@ -689,7 +1305,819 @@ def type4_operation(reader_index=1, operation="read", aid_hex=NDEF_APP_AID, offs
         return {"success": False, "error": str(e), "comm_log": get_comm_log()}
 
 
-def main():
+# AID Scan Functions
+def atr_historical_bytes(atr):
+    """Extract historical bytes from ATR (ISO 7816-3)"""
+    if not atr or len(atr) < 2:
+        return []
+    k = atr[1] & 0x0F
+    y = atr[1] >> 4
+    i = 2
+    while True:
+        # TA, TB, TC present bits, TD last so it can chain
+        i += bin(y & 0x07).count("1")
+        if not y & 0x08 or i >= len(atr):
+            break
+        y = atr[i] >> 4
+        i += 1
+    return list(atr[i:i + k])
+
+
+def atr_fingerprint(atr):
+    """ATR fingerprint used as cache key (historical bytes, or full ATR if none)"""
+    hist = atr_historical_bytes(atr)
+    return hex_upper(bytes(hist or atr or []))
+
+
+def atr_card_services(hist):
+    """Read card capabilities from historical bytes"""
+    services = {"storage_card": False, "select_full": None, "select_partial": None}
+    if hist[:len(PCSC_STORAGE_CARD_PREFIX)] == PCSC_STORAGE_CARD_PREFIX:
+        # PC/SC part 3 ATR for memory cards: no ISO 7816-4 applications
+        services["storage_card"] = True
+        return services
+    if not hist or hist[0] not in (0x00, 0x80):
+        return services
+    # Category 0x00 keeps 3 status bytes at the end, 0x80 is all compact-TLV
+    body = hist[1:-3] if hist[0] == 0x00 else hist[1:]
+    i = 0
+    while i < len(body):
+        tag, length = body[i] >> 4, body[i] & 0x0F
+        if tag == 0x3 and length >= 1 and i + 1 < len(body):
+            services["select_full"] = bool(body[i + 1] & 0x80)
+            services["select_partial"] = bool(body[i + 1] & 0x40)
+        i += 1 + length
+    return services
+
+
+def parse_fci_df_name(data):
+    """Extract DF name (tag 84) from a SELECT FCI template"""
+    if not data or len(data) < 2 or data[0] != 0x6F:
+        return None
+    i, end = 2, min(len(data), 2 + data[1])
+    while i + 1 < end:
+        tag, length = data[i], data[i + 1]
+        if tag == 0x84:
+            return hex_upper(bytes(data[i + 2:i + 2 + length]))
+        i += 2 + length
+    return None
+
+
+def load_aid_cache(path=AID_CACHE_FILE):
+    """Load ATR fingerprint -> AID scan results cache"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_aid_cache(cache, path=AID_CACHE_FILE):
+    """Persist AID scan results cache (best effort)"""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        return True
+    except OSError:
+        return False
+
+
+def load_aid_file(path):
+    """Load user AIDs from file: one 'AID [label]' per line, '#' comments"""
+    aids = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split(None, 1)
+            aids.append((parts[1] if len(parts) > 1 else "User", parts[0]))
+    return aids
+
+
+def build_aid_candidates(extra_aids=None):
+    """Merge user AIDs (first) with the built-in dictionary, dropping duplicates"""
+    candidates = []
+    seen = set()
+    for item in list(extra_aids or []) + KNOWN_AIDS:
+        label, aid_hex = item if isinstance(item, tuple) else ("User", item)
+        aid_hex = normalize_hex_string(aid_hex)
+        if not aid_hex or aid_hex in seen:
+            continue
+        if len(aid_hex) % 2 != 0 or len(aid_hex) > 32:
+            raise ValueError(f"Invalid AID: {aid_hex}")
+        bytes.fromhex(aid_hex)
+        seen.add(aid_hex)
+        candidates.append((label, aid_hex))
+    return candidates
+
+
+def scan_aid_candidates(connection, candidates, services):
+    """Select each candidate AID, pruning with ATR and partial-select results"""
+    results = {}
+    pruned = []
+
+    if services["storage_card"]:
+        pruned.append("ATR indicates storage card (no ISO 7816-4 applications)")
+        for _, aid_hex in candidates:
+            results[aid_hex] = {"sw": "", "present": False, "pruned": True}
+        return results, pruned
+
+    # Partial DF name selection enumerates every applet under a RID:
+    # SELECT first occurrence (P2=00), then next occurrence (P2=02) until 6A82.
+    # Absent members are only pruned when the enumeration found at least one
+    # DF name and ended on a real 6A82; an applet answering without an FCI
+    # DF name (tag 84) would otherwise look absent, so those groups fall back
+    # to individual SELECTs below.
+    if services["select_partial"]:
+        groups = {}
+        for _, aid_hex in candidates:
+            groups.setdefault(aid_hex[:10], []).append(aid_hex)
+        for rid, members in groups.items():
+            if len(members) < 2:
+                continue
+            found = []
+            complete = False
+            p2 = 0x00
+            for _ in range(16):
+                response = transmit(connection, Command.build(0x00, 0xA4, 0x04, p2, bytes.fromhex(rid), le=0))
+                if response.sw == 0x6A82:
+                    complete = True
+                    break
+                df_name = parse_fci_df_name(response.data) if response.ok else None
+                if not df_name or df_name in found:
+                    break
+                found.append(df_name)
+                p2 = 0x02
+            for df_name in found:
+                results.setdefault(df_name, {"sw": "9000", "present": True, "pruned": False})
+            if not (found and complete):
+                pruned.append(f"RID {rid}: partial select inconclusive, selecting individually")
+                continue
+            for aid_hex in members:
+                if aid_hex not in found:
+                    results[aid_hex] = {"sw": "", "present": False, "pruned": True}
+            pruned.append(f"RID {rid}: partial select found {len(found)} of {len(members)}")
+
+    for _, aid_hex in candidates:
+        if aid_hex in results:
+            continue
+        ok, sw, _ = type4_select_bytes(connection, bytes.fromhex(aid_hex))
+        results[aid_hex] = {"sw": sw, "present": ok, "pruned": False}
+        if sw in SW_SELECT_UNSUPPORTED:
+            pruned.append(f"SELECT by name not supported (SW={sw})")
+            for _, rest in candidates:
+                results.setdefault(rest, {"sw": "", "present": False, "pruned": True})
+            break
+
+    return results, pruned
+
+
+def scan_aids(reader_index=1, extra_aids=None, full=False, cache_path=AID_CACHE_FILE):
+    """Scan for known and user-supplied AIDs, using the ATR-keyed cache"""
+    clear_comm_log()
+    try:
+        try:
+            candidates = build_aid_candidates(extra_aids)
+        except ValueError as e:
+            return {"success": False, "error": str(e), "comm_log": get_comm_log()}
+
+        r_list = readers()
+        if len(r_list) == 0:
+            return {"success": False, "error": "No NFC readers found", "comm_log": get_comm_log()}
+
+        if reader_index >= len(r_list):
+            reader_index = 0
+
+        target_reader = r_list[reader_index]
+        reader_name = str(target_reader)
+
+        try:
+            connection = CardSession(target_reader.createConnection())
+            log_event('CONNECT', reader_name, 'Connecting to reader')
+            connection.connect()
+            log_event('CONNECTED', '', 'Connection established')
+            log_connection(connection)
+
+            atr = connection.getATR() or []
+            fingerprint = atr_fingerprint(atr)
+            services = atr_card_services(atr_historical_bytes(atr))
+
+            cache = load_aid_cache(cache_path)
+            cached = cache.get(fingerprint) if not full else None
+            cache_hit = False
+            results = {}
+            pruned = []
+
+            if cached:
+                # Confirm the card model with one SELECT of a known-present AID
+                present = cached.get("present", [])
+                confirmed = True
+                if present:
+                    ok, sw, _ = type4_select_bytes(connection, bytes.fromhex(present[0]))
+                    confirmed = ok
+                if confirmed:
+                    cache_hit = True
+                    for aid_hex in cached.get("scanned", []):
+                        results[aid_hex] = {"sw": "cached", "present": aid_hex in present, "pruned": False}
+                    for aid_hex in present:
+                        results[aid_hex] = {"sw": "cached", "present": True, "pruned": False}
+
+            remaining = [c for c in candidates if c[1] not in results]
+            if remaining:
+                scanned, pruned = scan_aid_candidates(connection, remaining, services)
+                results.update(scanned)
+
+            labels = dict((aid_hex, label) for label, aid_hex in candidates)
+            order = [aid_hex for _, aid_hex in candidates if aid_hex in results]
+            order += [aid_hex for aid_hex in results if aid_hex not in labels]
+            present = [aid_hex for aid_hex in order if results[aid_hex]["present"]]
+            cache[fingerprint] = {
+                "atr": hex_upper(bytes(atr)),
+                "present": present,
+                # Inferred absences are not cached, so a later hit re-checks them
+                "scanned": sorted(aid_hex for aid_hex, r in results.items() if not r["pruned"]),
+                "updated": datetime.now(timezone.utc).isoformat(),
+            }
+            cache_saved = save_aid_cache(cache, cache_path)
+
+            return {
+                "success": True,
+                "reader": reader_name,
+                "atr": hex_upper(bytes(atr), " "),
+                "fingerprint": fingerprint,
+                "cache_hit": cache_hit,
+                "cache_saved": cache_saved,
+                "aids": [
+                    {"aid": aid_hex, "name": labels.get(aid_hex, "Discovered"), **results[aid_hex]}
+                    for aid_hex in order
+                ],
+                "present": [{"aid": aid_hex, "name": labels.get(aid_hex, "Discovered")} for aid_hex in present],
+                "pruned": pruned,
+                "apdu_count": sum(1 for entry in comm_log if entry['type'] == 'TX'),
+                "comm_log": get_comm_log()
+            }
+
+        except NoCardException:
+            return {"success": False, "error": "No card present - please place card on reader", "reader": reader_name, "comm_log": get_comm_log()}
+        except CardConnectionException as e:
+            return {"success": False, "error": f"Card connection error: {str(e)}", "reader": reader_name, "comm_log": get_comm_log()}
+
+    except Exception as e:
+        return {"success": False, "error": str(e), "comm_log": get_comm_log()}
+
+
+# Card Identification (ATR fingerprint index)
+# Built-in families; user entries and learned ATRs live in ATR_INDEX_FILE.
+# Each entry matches an ATR prefix under an optional mask (hex, same length).
+ATR_FAMILIES = [
+    {"atr": "3B8F8001804F0CA000000306", "family": "storage", "name": "PC/SC storage card", "routine": "uid"},
+    {"atr": "3B8F8001804F0CA0000003060300010000000000", "mask": "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00",
+     "family": "mifare_classic_1k", "name": "MIFARE Classic 1K", "routine": "uid"},
+    {"atr": "3B8F8001804F0CA0000003060300020000000000", "mask": "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00",
+     "family": "mifare_classic_4k", "name": "MIFARE Classic 4K", "routine": "uid"},
+    {"atr": "3B8F8001804F0CA0000003060300030000000000", "mask": "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00",
+     "family": "mifare_ultralight", "name": "MIFARE Ultralight / NTAG", "routine": "uid"},
+    {"atr": "3B8180018080", "family": "desfire", "name": "NXP DESFire / NTAG 424 DNA", "routine": "type4"},
+    {"atr": "3B808001", "mask": "FFF0FFFF", "family": "iso14443_4", "name": "ISO 14443-4 card", "routine": "probe"},
+]
+ATR_INDEX_FILE = os.environ.get(
+    "NFC_ATR_INDEX", os.path.join(os.path.dirname(os.path.abspath(__file__)), "atr_index.json")
+)
+# Probe order for unknown ATRs: AID -> (family, name, routine, version)
+PROBE_AIDS = [
+    ("6F6E656B65792E6261636B757001", ("onekey_lite_v2", "OneKey Lite V2", "lite", "v2")),
+    ("D156000132834001", ("onekey_lite_v1", "OneKey Lite V1", "lite", "v1")),
+    (NDEF_APP_AID, ("ndef_type4", "NFC Forum Type 4 Tag", "type4", None)),
+]
+
+
+class AtrTrie:
+    """Prefix trie over ATR bytes with per-byte masks
+
+    Exact bytes (mask FF) are dict children; masked bytes are kept in a short
+    list and tested with (atr_byte & mask) == value. The deepest entry wins.
+    """
+
+    def __init__(self):
+        self.root = {"exact": {}, "masked": [], "entry": None}
+
+    def insert(self, entry):
+        pattern = bytes.fromhex(entry["atr"])
+        mask = bytes.fromhex(entry["mask"]) if entry.get("mask") else b"\xFF" * len(pattern)
+        if len(mask) != len(pattern):
+            raise ValueError(f"ATR mask length mismatch: {entry['atr']}")
+        node = self.root
+        for value, bits in zip(pattern, mask):
+            if bits == 0xFF:
+                node = node["exact"].setdefault(value, {"exact": {}, "masked": [], "entry": None})
+                continue
+            key = (value & bits, bits)
+            for masked_key, child in node["masked"]:
+                if masked_key == key:
+                    node = child
+                    break
+            else:
+                child = {"exact": {}, "masked": [], "entry": None}
+                node["masked"].append((key, child))
+                node = child
+        node["entry"] = entry
+
+    def match(self, atr):
+        """Return (entry, matched_length) of the longest matching prefix"""
+        best = (None, 0)
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node["entry"] is not None and depth >= best[1]:
+                best = (node["entry"], depth)
+            if depth >= len(atr):
+                continue
+            byte = atr[depth]
+            child = node["exact"].get(byte)
+            if child is not None:
+                stack.append((child, depth + 1))
+            for (value, bits), child in node["masked"]:
+                if byte & bits == value:
+                    stack.append((child, depth + 1))
+        return best
+
+
+# ATR index for this process, built on first use
+atr_index = None
+
+
+def load_atr_index(path=ATR_INDEX_FILE):
+    """Load user/learned ATR entries (list of dicts)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        return entries if isinstance(entries, list) else []
+    except (OSError, ValueError):
+        return []
+
+
+def get_atr_index(path=ATR_INDEX_FILE):
+    """Build the ATR trie once: built-in families, then user/learned entries"""
+    global atr_index
+    if atr_index is None:
+        atr_index = AtrTrie()
+        for entry in ATR_FAMILIES:
+            atr_index.insert(dict(entry, source="builtin"))
+        for entry in load_atr_index(path):
+            try:
+                atr_index.insert(dict(entry, source=entry.get("source", "user")))
+            except (KeyError, ValueError):
+                continue
+    return atr_index
+
+
+def learn_atr(atr_hex, family, name, routine, version=None, path=ATR_INDEX_FILE):
+    """Store an exact-ATR entry in the user index and the in-memory trie"""
+    entry = {"atr": atr_hex, "family": family, "name": name, "routine": routine, "source": "learned"}
+    if version:
+        entry["version"] = version
+    entries = [e for e in load_atr_index(path) if e.get("atr") != atr_hex or e.get("mask")]
+    entries.append(entry)
+    get_atr_index(path).insert(entry)
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        return True
+    except OSError:
+        return False
+
+
+def probe_card(connection, atr):
+    """Identify an unknown card: cached AID scan first, then a few SELECTs"""
+    present = load_aid_cache().get(atr_fingerprint(atr), {}).get("present", [])
+    for aid_hex, identity in PROBE_AIDS:
+        if aid_hex in present:
+            return identity
+    for aid_hex, identity in PROBE_AIDS:
+        ok, sw, _ = type4_select_bytes(connection, bytes.fromhex(aid_hex))
+        if ok:
+            return identity
+        if sw in SW_SELECT_UNSUPPORTED:
+            break
+    return ("unknown", "Unknown card", "uid", None)
+
+
+def forget_atr(atr_hex, path=ATR_INDEX_FILE):
+    """Drop a learned exact-ATR entry; the trie is rebuilt on next use"""
+    global atr_index
+    entries = load_atr_index(path)
+    kept = [e for e in entries if e.get("atr") != atr_hex or e.get("mask")]
+    if len(kept) == len(entries):
+        return False
+    atr_index = None
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(kept, f, indent=2)
+        return True
+    except OSError:
+        return False
+
+
+def identify_probe(connection, atr, atr_hex, result, index_path=ATR_INDEX_FILE):
+    """Probe the card and record the outcome in the result and the ATR index"""
+    family, name, routine, version = probe_card(connection, atr)
+    result.update(family=family, name=name, routine=routine, version=version, source="probe", learned=False)
+    if not atr_hex:
+        return
+    if family != "unknown":
+        result["learned"] = learn_atr(atr_hex, family, name, routine, version, index_path)
+    else:
+        forget_atr(atr_hex, index_path)
+
+
+def run_info_routine(connection, reader_name, result):
+    """Run the identified info routine on the identify session"""
+    routine = result["routine"]
+    if routine == "lite":
+        if result["source"] == "probe":
+            # The probe may have left the backup applet selected; the info
+            # routine starts in primary safety, as after power-up
+            select_primary_safety(connection)
+        return lite_info(connection, reader_name, result["version"] or "v2")
+    if routine == "type4":
+        return type4_info(connection, reader_name, NDEF_APP_AID)
+    return uid_info(connection, reader_name)
+
+
+def info_route_failed(routine, info):
+    """True if the info routine did not find the card it was routed for"""
+    if not info.get("success"):
+        return True
+    if routine == "lite":
+        return info.get("backup_status") is None
+    if routine == "type4":
+        return not info.get("selected")
+    return False
+
+
+def identify_card(reader_index=1, run_info=True, index_path=ATR_INDEX_FILE):
+    """Identify card family from its ATR, then run the matching info routine"""
+    clear_comm_log()
+    try:
+        r_list = readers()
+        if len(r_list) == 0:
+            return {"success": False, "error": "No NFC readers found", "comm_log": get_comm_log()}
+
+        if reader_index >= len(r_list):
+            reader_index = 0
+
+        target_reader = r_list[reader_index]
+        reader_name = str(target_reader)
+
+        try:
+            connection = CardSession(target_reader.createConnection())
+            log_event('CONNECT', reader_name, 'Connecting to reader')
+            connection.connect()
+            log_event('CONNECTED', '', 'Connection established')
+            log_connection(connection)
+
+            atr = connection.getATR() or []
+            atr_hex = hex_upper(bytes(atr))
+            entry, matched = get_atr_index(index_path).match(atr)
+
+            result = {
+                "success": True,
+                "reader": reader_name,
+                "atr": hex_upper(bytes(atr), " "),
+                "family": None,
+                "name": None,
+                "routine": None,
+                "version": None,
+                "source": None,
+                "matched_bytes": matched,
+                "learned": False
+            }
+
+            if entry is not None and entry.get("routine") != "probe":
+                result.update(family=entry["family"], name=entry.get("name", entry["family"]),
+                              routine=entry["routine"], version=entry.get("version"), source=entry["source"])
+            else:
+                identify_probe(connection, atr, atr_hex, result, index_path)
+
+            if run_info:
+                try:
+                    info = run_info_routine(connection, reader_name, result)
+                    # A learned exact-ATR route can go stale (e.g. a re-personalized card):
+                    # probe again and update the index instead of failing on every identify
+                    if result["source"] == "learned" and info_route_failed(result["routine"], info):
+                        log_event('IDENTIFY', atr_hex, f'Learned route {result["family"]} failed, probing again')
+                        identify_probe(connection, atr, atr_hex, result, index_path)
+                        info = run_info_routine(connection, reader_name, result)
+                except NoCardException:
+                    info = {"success": False, "error": "No card present - please place card on reader", "reader": reader_name}
+                except CardConnectionException as e:
+                    info = {"success": False, "error": f"Card connection error: {str(e)}", "reader": reader_name}
+                result["info"] = info
+                result["success"] = info.get("success", False)
+                if not result["success"]:
+                    result["error"] = info.get("error", "Info routine failed")
+            try:
+                connection.disconnect()
+            except Exception:
+                pass
+
+            result["comm_log"] = get_comm_log()
+            return result
+
+        except NoCardException:
+            return {"success": False, "error": "No card present - please place card on reader", "reader": reader_name, "comm_log": get_comm_log()}
+        except CardConnectionException as e:
+            return {"success": False, "error": f"Card connection error: {str(e)}", "reader": reader_name, "comm_log": get_comm_log()}
+
+    except Exception as e:
+        return {"success": False, "error": str(e), "comm_log": get_comm_log()}
+
+
+# Remote Agent
+#
+# `read_uid.py agent` serves the commands above over TCP (TLS with --cert/--key)
+# so one server.js can drive readers on many hosts. One JSON object per line;
+# both sides prove the shared token with HMAC-SHA256 over the peer's nonce:
+#   agent  -> {"event": "hello", "agent": name, "protocol": 2, "nonce": A, "tls": bool}
+#   client -> {"auth": hex(HMAC(token, "client:" + A)), "nonce": C}
+#   agent  -> {"event": "ready", "agent": name, "auth": hex(HMAC(token, "agent:" + C))}
+#             (or "error", then close)
+# then any number of requests on the same (keep-alive) connection. Every later
+# line is an envelope {"m": json, "mac": hex(HMAC(key, dir + ":" + seq + ":" + m))}
+# with key = HMAC(token, "session:" + A + ":" + C), dir "c" (client) or "a"
+# (agent) and seq counting each direction's messages from 0:
+#   client -> {"id": 1, "op": "run", "argv": ["-r", "0", "uid"], "env": {}, "input": hex, "stream": true}
+#   agent  -> {"id": 1, "event": "log", ...} ... {"id": 1, "event": "result", "result": {...}}
+#   client -> {"id": 2, "op": "ping"}            agent -> {"id": 2, "event": "pong", "agent": name}
+AGENT_PORT = 7410
+AGENT_PROTOCOL = 2
+AGENT_TOKEN_ENV = "NFC_AGENT_TOKEN"
+AGENT_CERT_ENV = "NFC_AGENT_CERT"
+AGENT_KEY_ENV = "NFC_AGENT_KEY"
+AGENT_HANDSHAKE_TIMEOUT = 10.0
+AGENT_ENV_KEYS = ("LITE_PIN",)  # environment a request may set
+AGENT_SECRET_FLOWS = ("verify", "backup", "restore")  # Lite flows carrying PIN/backup data, TLS only
+
+# Card access and the session globals (comm_log, stream_events, ...) are
+# per process, so agent requests run one at a time, across all readers and
+# connections; server.js keeps one connection per agent and queues there
+agent_lock = threading.Lock()
+
+
+def use_mock_readers(count, label):
+    """Replace PC/SC readers() with `count` simulated Type 4 readers"""
+    global readers
+    import mock_reader
+    readers = mock_reader.mock_readers(count, label)
+
+
+def agent_auth_digest(token, label, nonce):
+    """Handshake proof: HMAC-SHA256 of label:nonce keyed by the shared token"""
+    return hmac.new(token.encode("utf-8"), f"{label}:{nonce}".encode("utf-8"), "sha256").hexdigest()
+
+
+def agent_message_mac(key, direction, seq, body):
+    """Per-message MAC binding direction and sequence number to the JSON body"""
+    return hmac.new(key, f"{direction}:{seq}:{body}".encode("utf-8"), "sha256").hexdigest()
+
+
+def agent_help_requested(argv):
+    """True for -h/--help (or an abbreviation), which would print to the agent's stdout and exit"""
+    for arg in argv:
+        if arg == "--":
+            break
+        if arg == "-h" or (len(arg) > 2 and "--help".startswith(arg.split("=", 1)[0])):
+            return True
+    return False
+
+
+def agent_path_arguments(args):
+    """Options that would read or write files on the agent host"""
+    paths = []
+    if getattr(args, "data_file", None) not in (None, "-"):
+        paths.append("-f")
+    if getattr(args, "out", None):
+        paths.append("-o")
+    if getattr(args, "aid_file", None):
+        paths.append("--aid-file")
+    if getattr(args, "index", ATR_INDEX_FILE) != ATR_INDEX_FILE:
+        paths.append("--index")
+    if getattr(args, "cache", AID_CACHE_FILE) != AID_CACHE_FILE:
+        paths.append("--cache")
+    return paths
+
+
+def agent_run(request, sink, secure=False):
+    """Run one CLI request in-process, handing progress events to `sink`
+
+    Lite flows that carry the PIN or backup data are refused unless the
+    connection is TLS (`secure`).
+    """
+    global SESSION_MAX_RETRIES, stream_events, event_sink
+    argv = request.get("argv")
+    if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+        return {"success": False, "error": "argv must be a list of strings"}
+    if agent_help_requested(argv):
+        return {"success": False, "error": "Help is not available over the agent"}
+    env = request.get("env") or {}
+    if not isinstance(env, dict):
+        return {"success": False, "error": "env must be an object"}
+    env = {key: str(value) for key, value in env.items() if key in AGENT_ENV_KEYS}
+    try:
+        payload = bytes.fromhex(request.get("input") or "")
+    except (TypeError, ValueError):
+        return {"success": False, "error": "input must be a hex string"}
+
+    with agent_lock:
+        saved_env = {key: os.environ.get(key) for key in env}
+        saved_state = (SESSION_MAX_RETRIES, stream_events, event_sink, sys.stdin)
+        os.environ.update(env)
+        try:
+            try:
+                args = build_parser().parse_args(argv)
+            except SystemExit:
+                return {"success": False, "error": f"Invalid arguments: {' '.join(argv)}"}
+            if args.command in (None, "agent"):
+                return {"success": False, "error": f"Command not available over the agent: {args.command}"}
+            paths = agent_path_arguments(args)
+            if paths:
+                return {"success": False, "error": f"File options not accepted by the agent: {', '.join(paths)}"}
+            if args.command == "lite" and args.lite_cmd in AGENT_SECRET_FLOWS and not secure:
+                return {"success": False, "error": f"lite {args.lite_cmd} needs a TLS agent connection (start the agent with --cert/--key)"}
+
+            SESSION_MAX_RETRIES = max(0, args.retries)
+            stream_events = bool(request.get("stream"))
+            event_sink = sink
+            sys.stdin = io.TextIOWrapper(io.BytesIO(payload))
+            result = run_command(args)
+            if stream_events:
+                result.pop("comm_log", None)  # already streamed as log events
+            return result
+        finally:
+            SESSION_MAX_RETRIES, stream_events, event_sink, sys.stdin = saved_state
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    """TCP server for agent connections (one thread per connection)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, name, token, ssl_context=None):
+        super().__init__(address, AgentHandler)
+        self.name = name
+        self.token = token
+        self.ssl_context = ssl_context
+
+    def get_request(self):
+        sock, address = super().get_request()
+        if self.ssl_context is not None:
+            # The TLS handshake runs in the connection thread (authenticate)
+            sock = self.ssl_context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+        return sock, address
+
+
+class AgentHandler(socketserver.StreamRequestHandler):
+    """Authenticate one connection, then serve its requests in order"""
+
+    key = None  # session MAC key, set once both sides are authenticated
+
+    def send(self, message):
+        body = json.dumps(message)
+        if self.key is not None:
+            body = json.dumps({"m": body, "mac": agent_message_mac(self.key, "a", self.tx_seq, body)})
+            self.tx_seq += 1
+        self.wfile.write((body + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def receive(self, line):
+        """Verify one client envelope and return its message (None if forged)"""
+        try:
+            envelope = json.loads(line)
+            body, mac = str(envelope["m"]), str(envelope["mac"])
+        except (ValueError, TypeError, KeyError):
+            return None
+        expected = agent_message_mac(self.key, "c", self.rx_seq, body)
+        if not hmac.compare_digest(mac.encode("utf-8"), expected.encode("utf-8")):
+            return None
+        self.rx_seq += 1
+        try:
+            return json.loads(body)
+        except ValueError:
+            return {}
+
+    def authenticate(self):
+        nonce = secrets.token_hex(16)
+        self.request.settimeout(AGENT_HANDSHAKE_TIMEOUT)
+        try:
+            if self.server.ssl_context is not None:
+                self.request.do_handshake()
+            self.send({"event": "hello", "agent": self.server.name, "protocol": AGENT_PROTOCOL,
+                       "nonce": nonce, "tls": self.server.ssl_context is not None})
+            reply = json.loads(self.rfile.readline() or b"null")
+        except (OSError, ValueError):
+            return False
+        reply = reply if isinstance(reply, dict) else {}
+        proof = str(reply.get("auth", ""))
+        client_nonce = str(reply.get("nonce", ""))
+        expected = agent_auth_digest(self.server.token, "client", nonce)
+        if not client_nonce or not hmac.compare_digest(proof.encode("utf-8"), expected.encode("utf-8")):
+            try:
+                self.send({"event": "error", "error": "Authentication failed"})
+            except OSError:
+                pass
+            return False
+        self.request.settimeout(None)
+        self.request.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.send({"event": "ready", "agent": self.server.name,
+                   "auth": agent_auth_digest(self.server.token, "agent", client_nonce)})
+        session = f"session:{nonce}:{client_nonce}".encode("utf-8")
+        self.key = hmac.new(self.server.token.encode("utf-8"), session, "sha256").digest()
+        self.tx_seq = 0
+        self.rx_seq = 0
+        return True
+
+    def handle(self):
+        peer = f"{self.client_address[0]}:{self.client_address[1]}"
+        if not self.authenticate():
+            print(f"agent: rejected {peer}", file=sys.stderr)
+            return
+        print(f"agent: {peer} connected", file=sys.stderr)
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                request = self.receive(line)
+                if request is None:
+                    self.send({"id": None, "event": "error", "error": "Message authentication failed"})
+                    print(f"agent: bad message MAC from {peer}, closing", file=sys.stderr)
+                    break
+                self.dispatch(request)
+        except OSError:
+            pass
+        print(f"agent: {peer} disconnected", file=sys.stderr)
+
+    def dispatch(self, request):
+        if not isinstance(request, dict) or not request:
+            self.send({"id": None, "event": "error", "error": "Invalid JSON request"})
+            return
+        request_id = request.get("id")
+        op = request.get("op", "run")
+        if op == "ping":
+            self.send({"id": request_id, "event": "pong", "agent": self.server.name})
+        elif op == "run":
+            def sink(event):
+                try:
+                    self.send(dict(id=request_id, **event))
+                except OSError:
+                    pass  # client went away; let the card operation finish cleanly
+            result = agent_run(request, sink, secure=self.server.ssl_context is not None)
+            self.send({"id": request_id, "event": "result", "result": result})
+        else:
+            self.send({"id": request_id, "event": "error", "error": f"Unknown op: {op}"})
+
+
+def run_agent(args):
+    """Serve reader operations until interrupted"""
+    if not args.token:
+        print(json.dumps({"success": False, "error": f"Agent token required (${AGENT_TOKEN_ENV} or --token)"}))
+        return 1
+    if bool(args.cert) != bool(args.key):
+        print(json.dumps({"success": False, "error": "TLS needs both --cert and --key"}))
+        return 1
+    ssl_context = None
+    if args.cert:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        try:
+            ssl_context.load_cert_chain(args.cert, args.key)
+        except (OSError, ssl.SSLError) as e:
+            print(json.dumps({"success": False, "error": f"Cannot load TLS certificate: {e}"}))
+            return 1
+    try:
+        server = AgentServer((args.listen, args.port), args.name, args.token, ssl_context)
+    except OSError as e:
+        print(json.dumps({"success": False, "error": f"Cannot listen on {args.listen}:{args.port}: {e}"}))
+        return 1
+    transport = "TLS" if ssl_context else "plaintext TCP, Lite verify/backup/restore disabled"
+    print(f"agent: '{args.name}' listening on {args.listen}:{args.port} ({transport})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def build_parser():
+    """Command line parser, shared by main() and agent requests"""
     import argparse
 
     parser = argparse.ArgumentParser(
@@ -703,15 +2131,30 @@ Examples:
   %(prog)s apdu 00A4040000               Send raw APDU command
   %(prog)s lite                          Read OneKey Lite card info (V2)
   %(prog)s lite -v v1                    Read OneKey Lite V1 card info
+  %(prog)s lite verify --pin 123456      Verify Lite PIN
+  %(prog)s lite backup -f seed.bin       Back up file to Lite (PIN from $LITE_PIN)
+  %(prog)s lite restore -o seed.bin      Restore Lite backup to file
+  %(prog)s lite restore --batch 0 -o card{index}.bin  Restore a queue of cards
   %(prog)s type4                         Connect to Type 4 card
   %(prog)s type4 -a D276000085010100     Connect with custom AID
   %(prog)s type4 read -o 0 -l 32         Read 32 bytes from offset 0
   %(prog)s type4 write -o 0 -d 48454C4C4F  Write "HELLO" at offset 0
+  %(prog)s identify                      Identify card type from ATR and read its info
+  %(prog)s scan-aids                     Scan card for known AIDs
+  %(prog)s scan-aids -a A0000000041010   Scan with an extra AID
+  %(prog)s agent --port 7410             Serve this host's readers to a remote server.js
+  %(prog)s --mock-readers 2 agent        Agent with two simulated readers (no hardware)
 '''
     )
     parser.add_argument('-r', '--reader', type=int, default=1, help='Reader index (default: 1)')
     parser.add_argument('--json', action='store_true', help='Output raw JSON')
     parser.add_argument('--pretty', action='store_true', help='Force human-readable output')
+    parser.add_argument('--stream', action='store_true',
+                        help='Emit NDJSON progress events as each APDU completes, then a final result event')
+    parser.add_argument('--retries', type=int, default=SESSION_MAX_RETRIES,
+                        help=f'Recovery attempts per APDU on transient errors (default: {SESSION_MAX_RETRIES})')
+    parser.add_argument('--mock-readers', type=int, default=int(os.environ.get('NFC_MOCK_READERS', '0') or 0), metavar='N',
+                        help='Use N simulated Type 4 readers instead of PC/SC (default: $NFC_MOCK_READERS or 0)')
 
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
 
@@ -728,6 +2171,27 @@ Examples:
     # lite command
     lite_parser = subparsers.add_parser('lite', help='Read OneKey Lite card info')
     lite_parser.add_argument('-v', '--version', choices=['v1', 'v2'], default='v2', help='Card version (default: v2)')
+    lite_sub = lite_parser.add_subparsers(dest='lite_cmd', help='OneKey Lite flows')
+
+    lite_common = argparse.ArgumentParser(add_help=False)
+    lite_common.add_argument('--pin', default=os.environ.get('LITE_PIN', ''), help='6-digit PIN (default: $LITE_PIN)')
+    lite_common.add_argument('--auto-reset', action='store_true', help='Reset the card if the PIN is locked (documented flow)')
+    lite_common.add_argument('--batch', type=int, default=None, metavar='N', help='Process N cards in a row (0 = until --wait expires)')
+    lite_common.add_argument('--wait', type=float, default=30.0, help='Seconds to wait for each card in batch mode (default: 30)')
+
+    # lite verify
+    lite_sub.add_parser('verify', parents=[lite_common], help='Verify PIN')
+
+    # lite backup
+    lite_backup = lite_sub.add_parser('backup', parents=[lite_common], help='Back up data to card')
+    lite_backup_src = lite_backup.add_mutually_exclusive_group(required=True)
+    lite_backup_src.add_argument('-d', '--data', help='Data to back up in hex')
+    lite_backup_src.add_argument('-f', '--data-file', help="File with raw data to back up ('-' = stdin)")
+    lite_backup.add_argument('--overwrite', action='store_true', help='Replace an existing backup')
+
+    # lite restore
+    lite_restore = lite_sub.add_parser('restore', parents=[lite_common], help='Restore data from card')
+    lite_restore.add_argument('-o', '--out', help="Write raw data to file ('{index}' expands in batch mode)")
 
     # type4 command
     type4_parser = subparsers.add_parser('type4', help='Type 4 card operations')
@@ -744,13 +2208,35 @@ Examples:
     type4_write.add_argument('-o', '--offset', type=int, default=0, help='Write offset (default: 0)')
     type4_write.add_argument('-d', '--data', required=True, help='Data to write in hex')
 
-    args = parser.parse_args()
-
-    # Check if output is piped
-    is_tty = sys.stdout.isatty()
-    use_json = args.json or (not is_tty and not args.pretty)
-
-    # Execute command
+    # identify command
+    identify_parser = subparsers.add_parser('identify', help='Identify card type from ATR and run its info routine')
+    identify_parser.add_argument('--no-info', action='store_true', help='Only identify, do not run the info routine')
+    identify_parser.add_argument('--index', default=ATR_INDEX_FILE, help='ATR index file (default: $NFC_ATR_INDEX or scripts/atr_index.json)')
+
+    # scan-aids command
+    scan_parser = subparsers.add_parser('scan-aids', help='Scan card for known and user-supplied AIDs')
+    scan_parser.add_argument('-a', '--aid', action='append', default=[], help='Extra AID in hex (repeatable)')
+    scan_parser.add_argument('-f', '--aid-file', help="File with one 'AID [label]' per line")
+    scan_parser.add_argument('--full', action='store_true', help='Ignore cached results and scan every AID')
+    scan_parser.add_argument('--cache', default=AID_CACHE_FILE, help='AID cache file (default: $NFC_AID_CACHE or scripts/aid_cache.json)')
+
+    # agent command
+    agent_parser = subparsers.add_parser('agent', help='Serve reader operations to a remote server.js over TCP')
+    agent_parser.add_argument('--listen', default='0.0.0.0', help='Listen address (default: 0.0.0.0)')
+    agent_parser.add_argument('--port', type=int, default=AGENT_PORT, help=f'Listen port (default: {AGENT_PORT})')
+    agent_parser.add_argument('--name', default=socket.gethostname(), help='Agent name reported to the server (default: hostname)')
+    agent_parser.add_argument('--token', default=os.environ.get(AGENT_TOKEN_ENV, ''),
+                              help=f'Shared secret (default: ${AGENT_TOKEN_ENV}; prefer the variable, flags show in ps)')
+    agent_parser.add_argument('--cert', default=os.environ.get(AGENT_CERT_ENV, ''),
+                              help=f'TLS certificate chain (PEM); enables TLS (default: ${AGENT_CERT_ENV})')
+    agent_parser.add_argument('--key', default=os.environ.get(AGENT_KEY_ENV, ''),
+                              help=f'TLS private key (PEM) (default: ${AGENT_KEY_ENV})')
+
+    return parser
+
+
+def run_command(args):
+    """Execute a parsed command and return its result (None if no command)"""
     result = None
     if args.command == 'list':
         result = get_readers()
@@ -759,7 +2245,23 @@ Examples:
     elif args.command == 'apdu':
         result = send_raw_apdu(args.reader, args.apdu_hex)
     elif args.command == 'lite':
-        result = get_lite_info(args.reader, args.version)
+        if args.lite_cmd:
+            kwargs = {"pin": args.pin, "auto_reset": args.auto_reset}
+            try:
+                if args.lite_cmd == 'backup':
+                    kwargs["overwrite"] = args.overwrite
+                    kwargs["payload"] = bytes.fromhex(normalize_hex_string(args.data)) if args.data else read_binary(args.data_file)
+                elif args.lite_cmd == 'restore':
+                    kwargs["out_path"] = args.out
+            except (OSError, ValueError) as e:
+                result = {"success": False, "error": f"Invalid backup data: {e}"}
+            if result is None and args.batch is not None:
+                out_path = kwargs.pop("out_path", None)
+                result = lite_batch(args.reader, args.version, args.lite_cmd, args.batch, args.wait, out_path, **kwargs)
+            elif result is None:
+                result = lite_run(args.reader, args.version, args.lite_cmd, **kwargs)
+        else:
+            result = get_lite_info(args.reader, args.version)
     elif args.command == 'type4':
         if args.type4_cmd == 'read':
             result = type4_operation(args.reader, 'read', args.aid, args.offset, args.length)
@@ -767,21 +2269,67 @@ Examples:
             result = type4_operation(args.reader, 'write', args.aid, args.offset, 0, args.data)
         else:
             result = get_type4_info(args.reader, args.aid)
+    elif args.command == 'identify':
+        result = identify_card(args.reader, not args.no_info, args.index)
+    elif args.command == 'scan-aids':
+        extra_aids = list(args.aid)
+        if args.aid_file:
+            try:
+                extra_aids += load_aid_file(args.aid_file)
+            except OSError as e:
+                result = {"success": False, "error": f"Cannot read AID file: {e}"}
+        if result is None:
+            result = scan_aids(args.reader, extra_aids, args.full, args.cache)
     else:
+        return None
+
+    if args.command != 'list':
+        result.setdefault("recovery", get_recovery_stats())  # lite_batch reports its own totals
+    return result
+
+
+def main():
+    global SESSION_MAX_RETRIES, stream_events
+
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.mock_readers > 0:
+        use_mock_readers(args.mock_readers, args.name if args.command == 'agent' else 'local')
+    if args.command == 'agent':
+        sys.exit(run_agent(args))
+
+    SESSION_MAX_RETRIES = max(0, args.retries)
+    stream_events = args.stream
+
+    # Check if output is piped
+    is_tty = sys.stdout.isatty()
+    use_json = args.json or (not is_tty and not args.pretty)
+
+    # Execute command
+    result = run_command(args)
+    if result is None:
         parser.print_help()
         sys.exit(0)
 
     # Output result
-    if result:
-        if use_json:
-            print(json.dumps(result))
-        else:
-            print_formatted(result, args.command)
+    if stream_events:
+        result.pop("comm_log", None)  # already streamed as log events
+        emit_event('result', result=result)
+    elif use_json:
+        print(json.dumps(result))
+    else:
+        print_formatted(result, args.command)
 
 
 def print_formatted(result, command):
     """Print result in human-readable format"""
-    if not result.get('success', False):
+    recovery = result.get('recovery') or {}
+    if recovery.get('transient_errors'):
+        print(f"\033[93mRecovered {recovery['recoveries']}/{recovery['transient_errors']} "
+              f"transient errors in {recovery['recovery_ms']} ms\033[0m")
+
+    if not result.get('success', False) and not result.get('cards'):
         print(f"\033[91mError:\033[0m {result.get('error', 'Unknown error')}")
         return
 
@@ -805,6 +2353,25 @@ def print_formatted(result, command):
         if result.get('response'):
             print(f"\033[96mResponse:\033[0m {result.get('response')}")
 
+    elif command == 'lite' and 'cards' in result:
+        print(f"\033[96mOneKey Lite batch {result.get('action')}:\033[0m "
+              f"{result.get('succeeded', 0)}/{result.get('processed', 0)} OK in {result.get('total_ms')} ms")
+        for card in result.get('cards', []):
+            status = '\033[92mOK\033[0m' if card.get('success') else f"\033[91m{card.get('error')}\033[0m"
+            print(f"  [{card['index']}] {card['elapsed_ms']:>8} ms  {status}")
+        if result.get('error'):
+            print(f"\033[91mError:\033[0m {result['error']}")
+
+    elif command == 'lite' and 'action' in result:
+        print(f"\033[96mOneKey Lite {result.get('action')} ({result.get('version', 'v2').upper()}):\033[0m \033[92mOK\033[0m")
+        if 'bytes' in result:
+            print(f"  Bytes:    {result['bytes']}")
+        if result.get('out'):
+            print(f"  Output:   {result['out']}")
+        elif result.get('data'):
+            print(f"  Data:     {result['data']}")
+        print(f"  Switches: {result.get('applet_switches', 0)}")
+
     elif command == 'lite':
         print(f"\033[96mOneKey Lite ({result.get('version', 'v2').upper()}):\033[0m")
         print(f"  Serial:      {result.get('serial_number', 'N/A')}")
@@ -837,6 +2404,28 @@ def print_formatted(result, command):
             if op == 'read' and result.get('data'):
                 print(f"  Data:   {result.get('data')}")
 
+    elif command == 'identify':
+        version = f" ({result['version'].upper()})" if result.get('version') else ''
+        print(f"\033[96mCard:\033[0m {result.get('name')}{version}")
+        print(f"  ATR:     {result.get('atr', 'N/A')}")
+        learned = ', learned' if result.get('learned') else ''
+        print(f"  Match:   {result.get('source')} ({result.get('matched_bytes', 0)} bytes{learned})")
+        print(f"  Routine: {result.get('routine')}")
+        info = result.get('info') or {}
+        for key in ('uid', 'serial_number', 'pin_status', 'backup_status', 'aid', 'select_sw'):
+            if info.get(key) not in (None, ''):
+                print(f"  {key}: {info[key]}")
+
+    elif command == 'scan-aids':
+        cache_text = 'hit' if result.get('cache_hit') else 'miss'
+        print(f"\033[96mAID Scan:\033[0m {len(result.get('present', []))} found, "
+              f"{result.get('apdu_count', 0)} APDUs, cache {cache_text}")
+        print(f"  ATR:    {result.get('atr', 'N/A')}")
+        for item in result.get('present', []):
+            print(f"  \033[92m+\033[0m {item['aid']}  {item['name']}")
+        for note in result.get('pruned', []):
+            print(f"\033[90m  {note}\033[0m")
+
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,10 @@
 const express = require('express');
 const { spawn } = require('child_process');
 const path = require('path');
+const fs = require('fs');
+const net = require('net');
+const tls = require('tls');
+const crypto = require('crypto');
 const cors = require('cors');
 
 const app = express();
@@ -10,39 +14,97 @@ app.use(cors());
 app.use(express.json());
 app.use(express.static(path.join(__dirname, 'public')));
 
-// Store history in memory
+// Store history in memory (oldest first, ids increase monotonically)
+const HISTORY_LIMIT = parseInt(process.env.HISTORY_LIMIT, 10) || 1000;
 let uidHistory = [];
+let nextHistoryId = 1;
+// Changes on every start so clients can tell a restart from a quiet period
+const HISTORY_EPOCH = `${Date.now().toString(36)}-${crypto.randomBytes(4).toString('hex')}`;
 
 // Python virtual environment path
 const VENV_PYTHON = path.join(__dirname, 'venv_nfc', 'bin', 'python');
 const READ_UID_SCRIPT = path.join(__dirname, 'scripts', 'read_uid.py');
 
+// Remote reader agents (read_uid.py agent), e.g.
+// NFC_AGENTS="bench1=10.0.0.5:7410,bench2=10.0.0.6:7410"
+// Readers are addressed as "host:reader", where host is an agent name or
+// "local" for readers attached to this machine.
+const LOCAL_HOST = 'local';
+const LOCAL_READERS = process.env.LOCAL_READERS !== '0';
+const AGENT_TOKEN = process.env.NFC_AGENT_TOKEN || '';
+// TLS to agents: NFC_AGENT_TLS=1 (system CAs) or NFC_AGENT_CA=path (CA or
+// self-signed agent certificate). Without it Lite verify/backup/restore are
+// refused for remote readers.
+const AGENT_CA = process.env.NFC_AGENT_CA ? fs.readFileSync(process.env.NFC_AGENT_CA) : null;
+const AGENT_TLS = process.env.NFC_AGENT_TLS === '1' || !!AGENT_CA;
+const AGENT_PROTOCOL = 2;
+const AGENT_SECRET_FLOWS = ['verify', 'backup', 'restore'];
+// An agent runs one request at a time (all readers share its session state),
+// so extra connections only add failover, not concurrency
+const AGENT_POOL_SIZE = parseInt(process.env.AGENT_POOL_SIZE, 10) || 1;
+const AGENT_TIMEOUT_MS = parseInt(process.env.AGENT_TIMEOUT_MS, 10) || 120000;
+const AGENT_PING_MS = 15000;
+const AGENT_HANDSHAKE_MS = 10000;
+const AGENT_RECONNECT_MAX_MS = 30000;
+const READERS_CACHE_MS = parseInt(process.env.READERS_CACHE_MS, 10) || 5000;
+
 // API: Get NFC UID
 app.get('/api/uid', async (req, res) => {
     try {
-        const result = await readNfcUid();
-        if (result.success) {
-            // Add to history
-            const record = {
-                uid: result.uid,
-                timestamp: new Date().toISOString(),
-                reader: result.reader
-            };
-            uidHistory.unshift(record);
-            // Keep only last 50 records
-            if (uidHistory.length > 50) {
-                uidHistory = uidHistory.slice(0, 50);
+        await replyWithScript(req, res, ['uid'], {}, (result) => {
+            if (result.success) {
+                addHistoryRecord(result);
             }
-        }
-        res.json(result);
+        });
     } catch (error) {
         res.json({ success: false, error: error.message });
     }
 });
 
+// Add a successful UID read to history
+function addHistoryRecord(result) {
+    const record = {
+        id: nextHistoryId++,
+        uid: result.uid,
+        timestamp: new Date().toISOString(),
+        reader: result.reader,
+        host: result.host || LOCAL_HOST
+    };
+    uidHistory.push(record);
+    // Keep only last HISTORY_LIMIT records
+    if (uidHistory.length > HISTORY_LIMIT) {
+        uidHistory.splice(0, uidHistory.length - HISTORY_LIMIT);
+    }
+}
+
 // API: Get history
+// Without `since`, returns the full list (newest first). With `since=<id>`,
+// returns only newer records plus a cursor for the next call and the server
+// epoch the cursor is valid for.
 app.get('/api/history', (req, res) => {
-    res.json(uidHistory);
+    if (req.query.since === undefined) {
+        return res.json(uidHistory.slice().reverse());
+    }
+    const since = parseInt(req.query.since, 10) || 0;
+    // Binary search for the first record newer than the cursor
+    let lo = 0;
+    let hi = uidHistory.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (uidHistory[mid].id <= since) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    res.json({
+        entries: uidHistory.slice(lo).reverse(),
+        epoch: HISTORY_EPOCH,
+        cursor: nextHistoryId - 1,
+        oldest: uidHistory.length > 0 ? uidHistory[0].id : null,
+        total: uidHistory.length,
+        limit: HISTORY_LIMIT
+    });
 });
 
 // API: Clear history
@@ -61,22 +123,89 @@ app.post('/api/stop', (req, res) => {
     });
 });
 
-// API: Get available readers
+// API: Get available readers, merged across local readers and all agents.
+// Each host's list is cached for READERS_CACHE_MS (?refresh=1 bypasses it)
+// and an unreachable agent keeps serving its last good list, marked stale.
 app.get('/api/readers', async (req, res) => {
     try {
-        const result = await getReaders();
-        res.json(result);
+        const refresh = req.query.refresh === '1' || req.query.refresh === 'true';
+        const hosts = LOCAL_READERS ? [LOCAL_HOST, ...agents.keys()] : [...agents.keys()];
+        const lists = await Promise.all(hosts.map((host) => listReaders(host, refresh)));
+        const merged = { success: false, readers: [], count: 0, targets: [], hosts: [] };
+        const errors = [];
+        lists.forEach((list, i) => {
+            const host = hosts[i];
+            const names = list.readers || [];
+            merged.success = merged.success || !!list.success || names.length > 0;
+            names.forEach((name, index) => {
+                merged.readers.push(name);
+                merged.targets.push({ id: `${host}:${index}`, host, index, name });
+            });
+            if (list.error) {
+                errors.push(hosts.length > 1 ? `${host}: ${list.error}` : list.error);
+            }
+            merged.hosts.push({
+                host,
+                success: !!list.success,
+                count: names.length,
+                cached: !!list.cached,
+                stale: !!list.stale,
+                connected: host === LOCAL_HOST ? true : agents.get(host).connected(),
+                error: list.error
+            });
+        });
+        merged.count = merged.readers.length;
+        if (!merged.success && errors.length > 0) {
+            merged.error = errors.join('; ');
+        }
+        res.json(merged);
     } catch (error) {
         res.json({ success: false, error: error.message, readers: [] });
     }
 });
 
+// API: Identify card type from ATR and return its info
+app.get('/api/card', async (req, res) => {
+    try {
+        const runInfo = req.query.info !== '0' && req.query.info !== 'false';
+        await replyWithScript(req, res, runInfo ? ['identify'] : ['identify', '--no-info']);
+    } catch (error) {
+        res.json({ success: false, error: error.message });
+    }
+});
+
 // API: Get OneKey Lite card info
 app.get('/api/lite/info', async (req, res) => {
     try {
         const version = req.query.version || 'v2';
-        const result = await getLiteInfo(version);
-        res.json(result);
+        await replyWithScript(req, res, ['lite', '-v', version]);
+    } catch (error) {
+        res.json({ success: false, error: error.message });
+    }
+});
+
+// API: OneKey Lite business flows (verify / backup / restore)
+app.post('/api/lite/:action(verify|backup|restore)', async (req, res) => {
+    try {
+        const { version, pin, data, overwrite } = req.body;
+        if (!pin) {
+            return res.json({ success: false, error: 'PIN required' });
+        }
+        if (req.params.action === 'backup' && !/^([0-9a-fA-F]{2})+$/.test(String(data || '').replace(/\s/g, ''))) {
+            return res.json({ success: false, error: 'Backup data hex string required' });
+        }
+        // PIN goes through the environment and backup data through stdin so
+        // neither shows up in the process list
+        const args = ['lite', '-v', version || 'v2', req.params.action];
+        const options = { env: { LITE_PIN: String(pin) } };
+        if (req.params.action === 'backup') {
+            args.push('-f', '-');
+            if (overwrite) {
+                args.push('--overwrite');
+            }
+            options.input = Buffer.from(String(data).replace(/\s/g, ''), 'hex');
+        }
+        await replyWithScript(req, res, args, options);
     } catch (error) {
         res.json({ success: false, error: error.message });
     }
@@ -89,8 +218,7 @@ app.post('/api/lite/apdu', async (req, res) => {
         if (!apdu) {
             return res.json({ success: false, error: 'APDU hex string required' });
         }
-        const result = await sendRawApdu(apdu);
-        res.json(result);
+        await replyWithScript(req, res, ['apdu', apdu]);
     } catch (error) {
         res.json({ success: false, error: error.message });
     }
@@ -100,8 +228,7 @@ app.post('/api/lite/apdu', async (req, res) => {
 app.get('/api/type4/info', async (req, res) => {
     try {
         const aid = req.query.aid || 'D2760000850101';
-        const result = await getType4Info(aid);
-        res.json(result);
+        await replyWithScript(req, res, ['type4', '-a', aid]);
     } catch (error) {
         res.json({ success: false, error: error.message });
     }
@@ -111,8 +238,8 @@ app.get('/api/type4/info', async (req, res) => {
 app.post('/api/type4/read', async (req, res) => {
     try {
         const { aid, offset, length } = req.body;
-        const result = await type4Read(aid || 'D2760000850101', offset || 0, length || 16);
-        res.json(result);
+        await replyWithScript(req, res, ['type4', '-a', aid || 'D2760000850101', 'read',
+            '-o', String(offset || 0), '-l', String(length || 16)]);
     } catch (error) {
         res.json({ success: false, error: error.message });
     }
@@ -125,243 +252,474 @@ app.post('/api/type4/write', async (req, res) => {
         if (!data) {
             return res.json({ success: false, error: 'Data hex string required' });
         }
-        const result = await type4Write(aid || 'D2760000850101', offset || 0, data);
-        res.json(result);
+        await replyWithScript(req, res, ['type4', '-a', aid || 'D2760000850101', 'write',
+            '-o', String(offset || 0), '-d', data]);
+    } catch (error) {
+        res.json({ success: false, error: error.message });
+    }
+});
+
+// API: Scan card for known and user-supplied AIDs
+app.get('/api/type4/scan', async (req, res) => {
+    try {
+        const aids = (req.query.aids || '').split(',').map(aid => aid.trim()).filter(Boolean);
+        const args = ['scan-aids'];
+        aids.forEach(aid => args.push('-a', aid));
+        if (req.query.full === '1' || req.query.full === 'true') {
+            args.push('--full');
+        }
+        await replyWithScript(req, res, args);
     } catch (error) {
         res.json({ success: false, error: error.message });
     }
 });
 
-// Function to read NFC UID
-function readNfcUid() {
-    return new Promise((resolve, reject) => {
-        const process = spawn(VENV_PYTHON, [READ_UID_SCRIPT, 'uid']);
+// Run read_uid.py and resolve with its JSON result.
+// With options.onEvent the script runs with --stream: each NDJSON event is
+// handed on as soon as its line is complete and only the final result is kept.
+function runScript(args, options = {}) {
+    const { env, input, onEvent, fallback = {} } = options;
+    return new Promise((resolve) => {
+        const scriptArgs = onEvent ? [READ_UID_SCRIPT, '--stream', ...args] : [READ_UID_SCRIPT, ...args];
+        const child = spawn(VENV_PYTHON, scriptArgs, { env: { ...process.env, ...env } });
         let stdout = '';
         let stderr = '';
+        let result = null;
 
-        process.stdout.on('data', (data) => {
-            stdout += data.toString();
+        child.stdout.setEncoding('utf8');
+        child.stdout.on('data', (data) => {
+            stdout += data;
+            if (!onEvent) {
+                return;
+            }
+            // Forward complete lines, keep the partial tail for the next chunk
+            const lines = stdout.split('\n');
+            stdout = lines.pop();
+            lines.forEach((line) => {
+                if (!line.trim()) {
+                    return;
+                }
+                try {
+                    const event = JSON.parse(line);
+                    if (event.event === 'result') {
+                        result = event.result;
+                    } else if (event.event === undefined) {
+                        result = event;  // plain JSON, e.g. pyscard import error
+                    }
+                    onEvent(event, line);
+                } catch (e) {
+                    stderr += line;
+                }
+            });
         });
 
-        process.stderr.on('data', (data) => {
+        child.stderr.on('data', (data) => {
             stderr += data.toString();
         });
 
-        process.on('close', (code) => {
+        child.on('close', (code) => {
+            if (onEvent && result) {
+                return resolve(result);
+            }
             try {
-                const result = JSON.parse(stdout);
-                resolve(result);
+                resolve(JSON.parse(stdout));
             } catch (e) {
                 resolve({
                     success: false,
-                    error: stderr || stdout || 'Failed to parse response'
+                    error: stderr || stdout || 'Failed to parse response',
+                    ...fallback
                 });
             }
         });
 
-        process.on('error', (err) => {
-            resolve({ success: false, error: `Failed to execute script: ${err.message}` });
+        child.on('error', (err) => {
+            resolve({ success: false, error: `Failed to execute script: ${err.message}`, ...fallback });
         });
+
+        child.stdin.on('error', () => {});
+        child.stdin.end(input);
     });
 }
 
-// Function to get available readers
-function getReaders() {
-    return new Promise((resolve, reject) => {
-        const process = spawn(VENV_PYTHON, [READ_UID_SCRIPT, 'list']);
-        let stdout = '';
-        let stderr = '';
-
-        process.stdout.on('data', (data) => {
-            stdout += data.toString();
-        });
+// Parse "host:reader" (or "host", or a bare local reader index). Without a
+// reader index the script's own default reader is used.
+function parseReaderTarget(value) {
+    const text = String(value || '').trim();
+    if (!text) {
+        return { host: LOCAL_HOST, index: null };
+    }
+    const colon = text.lastIndexOf(':');
+    const tail = colon >= 0 ? text.slice(colon + 1) : text;
+    if (/^\d+$/.test(tail)) {
+        return { host: colon > 0 ? text.slice(0, colon) : LOCAL_HOST, index: parseInt(tail, 10) };
+    }
+    return { host: text, index: null };
+}
 
-        process.stderr.on('data', (data) => {
-            stderr += data.toString();
-        });
+// Run a read_uid.py command on the reader's host: a local child process, or
+// a request over the agent's pooled connection
+function runOnReader(target, args, options = {}) {
+    const readerArgs = target.index === null ? args : ['-r', String(target.index), ...args];
+    if (target.host === LOCAL_HOST) {
+        return runScript(readerArgs, options);
+    }
+    const pool = agents.get(target.host);
+    if (!pool) {
+        return Promise.resolve({ success: false, error: `Unknown reader host: ${target.host}`, ...(options.fallback || {}) });
+    }
+    return pool.run(readerArgs, options);
+}
 
-        process.on('close', (code) => {
-            try {
-                const result = JSON.parse(stdout);
-                resolve(result);
-            } catch (e) {
-                resolve({
-                    success: false,
-                    error: stderr || stdout || 'Failed to parse response',
-                    readers: []
-                });
-            }
-        });
+// Cached per-host reader lists; concurrent callers share one in-flight request
+const readersCache = new Map();
 
-        process.on('error', (err) => {
-            resolve({ success: false, error: `Failed to execute script: ${err.message}`, readers: [] });
-        });
+function listReaders(host, refresh) {
+    const cached = readersCache.get(host);
+    if (cached && (cached.pending || (!refresh && Date.now() - cached.at < READERS_CACHE_MS))) {
+        return cached.pending || Promise.resolve({ ...cached.result, cached: true });
+    }
+    const pending = runOnReader({ host, index: null }, ['list'], { fallback: { readers: [] } }).then((result) => {
+        if (!result.success && cached && cached.result && cached.result.success) {
+            result = { ...cached.result, stale: true, error: result.error };
+        }
+        readersCache.set(host, { at: Date.now(), result });
+        return result;
     });
+    readersCache.set(host, { ...cached, pending });
+    return pending;
 }
 
-// Function to get OneKey Lite info
-function getLiteInfo(version) {
-    return new Promise((resolve, reject) => {
-        const process = spawn(VENV_PYTHON, [READ_UID_SCRIPT, 'lite', '-v', version]);
-        let stdout = '';
-        let stderr = '';
+function agentHmac(key, text) {
+    return crypto.createHmac('sha256', key).update(text).digest('hex');
+}
 
-        process.stdout.on('data', (data) => {
-            stdout += data.toString();
-        });
+function safeEqual(a, b) {
+    const left = Buffer.from(String(a));
+    const right = Buffer.from(String(b));
+    return left.length === right.length && crypto.timingSafeEqual(left, right);
+}
 
-        process.stderr.on('data', (data) => {
-            stderr += data.toString();
+// One mutually authenticated, keep-alive connection to an agent. Requests
+// are written as MAC'd JSON-line envelopes and matched to replies by id
+// (protocol in scripts/read_uid.py, "Remote Agent").
+class AgentConnection {
+    constructor(pool) {
+        this.pool = pool;
+        this.socket = null;
+        this.ready = null;
+        this.isReady = false;
+        this.buffer = '';
+        this.nextId = 1;
+        this.pending = new Map();
+        this.retryMs = 1000;
+        this.pingTimer = null;
+        this.key = null;
+        this.queue = Promise.resolve();
+        this.queued = 0;
+    }
+
+    connect() {
+        if (this.ready) {
+            return this.ready;
+        }
+        const { host, port, name } = this.pool;
+        this.ready = new Promise((resolve, reject) => {
+            const socket = AGENT_TLS
+                ? tls.connect({ host, port, ca: AGENT_CA || undefined, servername: net.isIP(host) ? undefined : host })
+                : net.connect({ host, port });
+            this.socket = socket;
+            this.handshake = { resolve, reject };
+            socket.setEncoding('utf8');
+            socket.setNoDelay(true);
+            socket.setKeepAlive(true, AGENT_PING_MS);
+            socket.setTimeout(AGENT_HANDSHAKE_MS, () => socket.destroy(new Error('handshake timeout')));
+            socket.on('data', (chunk) => this.onData(chunk));
+            socket.on('error', (err) => {
+                this.lastError = err.message;
+            });
+            socket.on('close', () => this.onClose());
         });
+        this.ready.catch(() => {});
+        return this.ready;
+    }
 
-        process.on('close', (code) => {
+    onData(chunk) {
+        this.buffer += chunk;
+        const lines = this.buffer.split('\n');
+        this.buffer = lines.pop();
+        lines.forEach((line) => {
+            if (!line.trim()) {
+                return;
+            }
+            let message;
             try {
-                const result = JSON.parse(stdout);
-                resolve(result);
+                message = JSON.parse(line);
             } catch (e) {
-                resolve({
-                    success: false,
-                    error: stderr || stdout || 'Failed to parse response'
-                });
+                return;
             }
-        });
-
-        process.on('error', (err) => {
-            resolve({ success: false, error: `Failed to execute script: ${err.message}` });
-        });
-    });
-}
-
-// Function to send raw APDU
-function sendRawApdu(apduHex) {
-    return new Promise((resolve, reject) => {
-        const process = spawn(VENV_PYTHON, [READ_UID_SCRIPT, 'apdu', apduHex]);
-        let stdout = '';
-        let stderr = '';
-
-        process.stdout.on('data', (data) => {
-            stdout += data.toString();
-        });
-
-        process.stderr.on('data', (data) => {
-            stderr += data.toString();
-        });
-
-        process.on('close', (code) => {
+            if (!this.isReady) {
+                this.onHandshake(message);
+                return;
+            }
+            const body = typeof message.m === 'string' ? message.m : '';
+            if (!safeEqual(message.mac, agentHmac(this.key, `a:${this.rxSeq}:${body}`))) {
+                this.lastError = 'message authentication failed';
+                this.socket.destroy();
+                return;
+            }
+            this.rxSeq += 1;
             try {
-                const result = JSON.parse(stdout);
-                resolve(result);
+                this.onMessage(JSON.parse(body));
             } catch (e) {
-                resolve({
-                    success: false,
-                    error: stderr || stdout || 'Failed to parse response'
-                });
+                // authenticated but malformed: ignore like any unmatched message
             }
         });
+    }
 
-        process.on('error', (err) => {
-            resolve({ success: false, error: `Failed to execute script: ${err.message}` });
-        });
-    });
-}
+    onHandshake(message) {
+        if (message.event === 'hello') {
+            if (message.protocol !== AGENT_PROTOCOL) {
+                this.lastError = `agent protocol ${message.protocol}, expected ${AGENT_PROTOCOL}`;
+                this.socket.destroy();
+                return;
+            }
+            this.agentNonce = String(message.nonce);
+            this.clientNonce = crypto.randomBytes(16).toString('hex');
+            const auth = agentHmac(AGENT_TOKEN, `client:${this.agentNonce}`);
+            this.socket.write(JSON.stringify({ auth, nonce: this.clientNonce }) + '\n');
+        } else if (message.event === 'ready') {
+            // The agent proves it holds the token too, so a spoofed agent
+            // cannot collect PINs or backup data
+            if (!this.clientNonce || !safeEqual(message.auth, agentHmac(AGENT_TOKEN, `agent:${this.clientNonce}`))) {
+                this.lastError = 'agent failed authentication';
+                this.socket.destroy();
+                return;
+            }
+            this.key = crypto.createHmac('sha256', AGENT_TOKEN)
+                .update(`session:${this.agentNonce}:${this.clientNonce}`).digest();
+            this.txSeq = 0;
+            this.rxSeq = 0;
+            this.isReady = true;
+            this.retryMs = 1000;
+            this.lastError = null;
+            this.socket.setTimeout(0);
+            this.pingTimer = setInterval(() => this.ping(), AGENT_PING_MS);
+            this.handshake.resolve();
+        } else {
+            this.lastError = message.error || 'handshake failed';
+            this.socket.destroy();
+        }
+    }
 
-// Function to get Type 4 card info
-function getType4Info(aid) {
-    return new Promise((resolve, reject) => {
-        const process = spawn(VENV_PYTHON, [READ_UID_SCRIPT, 'type4', '-a', aid]);
-        let stdout = '';
-        let stderr = '';
+    onMessage(message) {
+        const request = this.pending.get(message.id);
+        if (!request) {
+            return;
+        }
+        if (message.event === 'result' || message.event === 'pong' || message.event === 'error') {
+            this.pending.delete(message.id);
+            clearTimeout(request.timer);
+            request.resolve(message);
+        } else if (request.onEvent) {
+            const { id, ...event } = message;
+            request.onEvent(event);
+        }
+    }
 
-        process.stdout.on('data', (data) => {
-            stdout += data.toString();
+    onClose() {
+        const error = `Agent ${this.pool.name} disconnected${this.lastError ? `: ${this.lastError}` : ''}`;
+        clearInterval(this.pingTimer);
+        this.pending.forEach((request) => {
+            clearTimeout(request.timer);
+            request.resolve({ event: 'error', error });
         });
+        this.pending.clear();
+        if (!this.isReady && this.handshake) {
+            this.handshake.reject(new Error(this.lastError || 'connection closed'));
+        }
+        this.socket = null;
+        this.ready = null;
+        this.isReady = false;
+        this.buffer = '';
+        this.key = null;
+        this.clientNonce = null;
+        // Keep the pool warm: reconnect in the background with backoff
+        if (!this.reconnectTimer) {
+            this.reconnectTimer = setTimeout(() => {
+                this.reconnectTimer = null;
+                this.connect();
+            }, this.retryMs);
+            this.retryMs = Math.min(this.retryMs * 2, AGENT_RECONNECT_MAX_MS);
+        }
+    }
 
-        process.stderr.on('data', (data) => {
-            stderr += data.toString();
+    // Send one request and resolve with the agent's final message. The agent
+    // serves requests one by one, so they are queued here and the timeout
+    // only covers the request's own run time.
+    request(message, onEvent, timeoutMs = AGENT_TIMEOUT_MS) {
+        this.queued += 1;
+        const run = this.queue.then(() => this.dispatch(message, onEvent, timeoutMs));
+        this.queue = run.catch(() => {});
+        return run.finally(() => {
+            this.queued -= 1;
         });
+    }
 
-        process.on('close', (code) => {
-            try {
-                const result = JSON.parse(stdout);
-                resolve(result);
-            } catch (e) {
-                resolve({
-                    success: false,
-                    error: stderr || stdout || 'Failed to parse response'
-                });
-            }
+    async dispatch(message, onEvent, timeoutMs) {
+        await this.connect();
+        const id = this.nextId++;
+        return new Promise((resolve) => {
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                resolve({ event: 'error', error: `Agent ${this.pool.name} timed out` });
+                // The agent may still be busy with this request; start fresh
+                if (this.socket) {
+                    this.socket.destroy();
+                }
+            }, timeoutMs);
+            this.pending.set(id, { resolve, onEvent, timer });
+            this.send({ id, ...message });
         });
+    }
 
-        process.on('error', (err) => {
-            resolve({ success: false, error: `Failed to execute script: ${err.message}` });
-        });
-    });
-}
+    send(message) {
+        const body = JSON.stringify(message);
+        const mac = agentHmac(this.key, `c:${this.txSeq}:${body}`);
+        this.txSeq += 1;
+        this.socket.write(JSON.stringify({ m: body, mac }) + '\n');
+    }
 
-// Function to read from Type 4 card
-function type4Read(aid, offset, length) {
-    return new Promise((resolve, reject) => {
-        const process = spawn(VENV_PYTHON, [READ_UID_SCRIPT, 'type4', '-a', aid, 'read', '-o', String(offset), '-l', String(length)]);
-        let stdout = '';
-        let stderr = '';
+    ping() {
+        if (this.isReady && this.queued === 0) {
+            this.request({ op: 'ping' }, null, AGENT_PING_MS);
+        }
+    }
 
-        process.stdout.on('data', (data) => {
-            stdout += data.toString();
-        });
+    load() {
+        return this.isReady ? this.queued : Infinity;
+    }
+}
 
-        process.stderr.on('data', (data) => {
-            stderr += data.toString();
-        });
+// Pool of connections to one agent; each request goes to the least busy one
+class AgentPool {
+    constructor(name, host, port, size) {
+        this.name = name;
+        this.host = host;
+        this.port = port;
+        this.connections = Array.from({ length: size }, () => new AgentConnection(this));
+        this.connections.forEach((connection) => connection.connect());
+    }
 
-        process.on('close', (code) => {
-            try {
-                const result = JSON.parse(stdout);
-                resolve(result);
-            } catch (e) {
-                resolve({
-                    success: false,
-                    error: stderr || stdout || 'Failed to parse response'
-                });
-            }
-        });
+    connected() {
+        return this.connections.some((connection) => connection.isReady);
+    }
 
-        process.on('error', (err) => {
-            resolve({ success: false, error: `Failed to execute script: ${err.message}` });
-        });
-    });
+    async run(args, options = {}) {
+        const { env, input, onEvent, fallback = {} } = options;
+        const lite = args.indexOf('lite');
+        if (!AGENT_TLS && lite >= 0 && args.slice(lite).some((arg) => AGENT_SECRET_FLOWS.includes(arg))) {
+            return { success: false, error: `Lite PIN/backup flows need TLS to agent ${this.name} (set NFC_AGENT_CA)`, ...fallback };
+        }
+        const connection = this.connections.reduce((best, c) => (c.load() < best.load() ? c : best));
+        const message = {
+            op: 'run',
+            argv: args,
+            env: env || {},
+            input: input ? Buffer.from(input).toString('hex') : '',
+            stream: !!onEvent
+        };
+        let reply;
+        try {
+            reply = await connection.request(message, onEvent && ((event) => {
+                onEvent(event, JSON.stringify(event));
+            }));
+        } catch (error) {
+            reply = { event: 'error', error: `Agent ${this.name} unavailable: ${error.message}` };
+        }
+        if (reply.event !== 'result') {
+            return { success: false, error: reply.error || 'Agent error', ...fallback };
+        }
+        return { ...reply.result, host: this.name };
+    }
 }
 
-// Function to write to Type 4 card
-function type4Write(aid, offset, dataHex) {
-    return new Promise((resolve, reject) => {
-        const process = spawn(VENV_PYTHON, [READ_UID_SCRIPT, 'type4', '-a', aid, 'write', '-o', String(offset), '-d', dataHex]);
-        let stdout = '';
-        let stderr = '';
+// Agents from NFC_AGENTS: "name=host:port" or "host:port" (named host:port)
+const agents = new Map();
+(process.env.NFC_AGENTS || '').split(',').map((entry) => entry.trim()).filter(Boolean).forEach((entry) => {
+    const eq = entry.indexOf('=');
+    const name = eq >= 0 ? entry.slice(0, eq).trim() : entry;
+    const address = eq >= 0 ? entry.slice(eq + 1).trim() : entry;
+    const colon = address.lastIndexOf(':');
+    const host = colon > 0 ? address.slice(0, colon) : address;
+    const port = colon > 0 ? parseInt(address.slice(colon + 1), 10) : 7410;
+    if (name === LOCAL_HOST || agents.has(name)) {
+        console.warn(`Ignoring agent "${entry}": duplicate or reserved name`);
+        return;
+    }
+    agents.set(name, new AgentPool(name, host, port, AGENT_POOL_SIZE));
+});
+if (agents.size > 0 && !AGENT_TOKEN) {
+    console.warn('NFC_AGENTS is set but NFC_AGENT_TOKEN is empty; agents will reject the handshake');
+}
 
-        process.stdout.on('data', (data) => {
-            stdout += data.toString();
-        });
+// Streaming is opt-in: ?stream=1 or Accept: application/x-ndjson for chunked
+// NDJSON, ?stream=sse or Accept: text/event-stream for Server-Sent Events
+function streamMode(req) {
+    const accept = req.get('Accept') || '';
+    if (req.query.stream === 'sse' || accept.includes('text/event-stream')) {
+        return 'sse';
+    }
+    if (req.query.stream === '1' || req.query.stream === 'ndjson' || accept.includes('application/x-ndjson')) {
+        return 'ndjson';
+    }
+    return null;
+}
 
-        process.stderr.on('data', (data) => {
-            stderr += data.toString();
-        });
+// Run the script and reply with one JSON document, or forward its progress
+// events as they arrive when the client asked for a stream
+async function replyWithScript(req, res, args, options = {}, onResult) {
+    const target = parseReaderTarget(req.query.reader || (req.body && req.body.reader));
+    const mode = streamMode(req);
+    if (!mode) {
+        const result = await runOnReader(target, args, options);
+        if (onResult) {
+            onResult(result);
+        }
+        return res.json(result);
+    }
 
-        process.on('close', (code) => {
-            try {
-                const result = JSON.parse(stdout);
-                resolve(result);
-            } catch (e) {
-                resolve({
-                    success: false,
-                    error: stderr || stdout || 'Failed to parse response'
-                });
-            }
-        });
+    res.set({
+        'Content-Type': mode === 'sse' ? 'text/event-stream' : 'application/x-ndjson',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    });
+    res.flushHeaders();
 
-        process.on('error', (err) => {
-            resolve({ success: false, error: `Failed to execute script: ${err.message}` });
-        });
+    const write = (line) => {
+        if (!res.writableEnded) {
+            res.write(mode === 'sse' ? `data: ${line}\n\n` : `${line}\n`);
+        }
+    };
+    let resultSent = false;
+    const result = await runOnReader(target, args, {
+        ...options,
+        onEvent: (event, line) => {
+            if (event.event === undefined) {
+                write(JSON.stringify({ event: 'result', result: event }));
+                resultSent = true;
+                return;
+            }
+            resultSent = resultSent || event.event === 'result';
+            write(line);
+        }
     });
+    if (onResult) {
+        onResult(result);
+    }
+    if (!resultSent) {
+        write(JSON.stringify({ event: 'result', result }));
+    }
+    res.end();
 }
 
 app.listen(PORT, () => {